@@ -0,0 +1,98 @@
+"""
+backfill.py: Computes the report for every date with orders in parallel across a pool of worker processes, and writes
+the results to a csv, json or parquet file, e.g. to export them or to warm caches.
+"""
+
+from eshopreport import db
+from eshopreport.models import Order, ReportForDate
+from multiprocessing import Pool
+import argparse
+import json
+import os
+import pandas as pd
+import sys
+import time
+
+FORMATS = ['csv', 'json', 'parquet']
+
+COLUMNS = ['date', 'total_items', 'total_customers', 'total_discount', 'avg_discount_rate', 'avg_order_total',
+           'total_commissions', 'avg_commissions_per_order']
+
+# Minimum number of seconds between progress updates
+PROGRESS_INTERVAL = 0.5
+
+
+def main(output, output_format=None, processes=None, chunk_size=8):
+    output_format = output_format or os.path.splitext(output)[1].lstrip('.')
+    if output_format not in FORMATS:
+        raise ValueError(f"Output format must be one of {', '.join(FORMATS)}, not {output_format!r}")
+
+    dates = get_report_dates()
+    db.session.remove()
+    results = compute_reports(dates, processes, chunk_size)
+    write_results(results, output, output_format)
+    print(f"Wrote {len(results):,} reports to {output}")
+
+
+def get_report_dates():
+    """list: returns every distinct date on which an order was created, in order"""
+    return [row[0] for row in db.session.query(Order.created_at).distinct().order_by(Order.created_at)]
+
+
+def init_worker():
+    """None: Discards any database connections inherited from the parent process, so that each worker opens its own.
+    The worker's session then keeps that one connection, as it only reads and never commits."""
+    db.session.remove()
+    db.engine.dispose()
+
+
+def compute_report(date):
+    """dict: returns the results of the report for the date, or None if it has no order lines"""
+    try:
+        return ReportForDate(date).get_all_results()
+    except IndexError:
+        return None
+
+
+def compute_reports(dates, processes=None, chunk_size=8):
+    """list: Computes the report for each date across a pool of processes (one per core by default), printing the
+    progress and throughput, and returns the results in date order. Dates with no order lines are left out."""
+    start = last_printed = time.perf_counter()
+    results = []
+    with Pool(processes, initializer=init_worker) as pool:
+        for done, result in enumerate(pool.imap(compute_report, dates, chunksize=chunk_size), start=1):
+            if result is not None:
+                results.append(result)
+            now = time.perf_counter()
+            if now - last_printed >= PROGRESS_INTERVAL or done == len(dates):
+                print(f"\r{done:,}/{len(dates):,} dates, {done / (now - start):,.1f} reports/sec", end='',
+                      file=sys.stderr)
+                last_printed = now
+    print(file=sys.stderr)
+    return results
+
+
+def write_results(results, output, output_format):
+    """None: Writes the report results to the output file as csv, json (a list with an object per report) or parquet"""
+    if output_format == 'json':
+        with open(output, 'w') as output_file:
+            json.dump([dict(result, date=result['date'].isoformat()) for result in results], output_file, indent=2)
+        return
+
+    df = pd.DataFrame(results, columns=COLUMNS)
+    if output_format == 'csv':
+        df.to_csv(output, index=False)
+    else:
+        # Requires pyarrow or fastparquet
+        df['date'] = pd.to_datetime(df['date'])
+        df.to_parquet(output, index=False)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compute the report for every date with orders in parallel")
+    parser.add_argument("output", help="file to write the reports to, e.g. reports.csv")
+    parser.add_argument("--format", choices=FORMATS, help="output format, by default taken from the file extension")
+    parser.add_argument("--processes", type=int, help="number of worker processes, by default one per core")
+    parser.add_argument("--chunk-size", type=int, default=8, help="number of dates sent to a worker at a time")
+    args = parser.parse_args()
+    main(args.output, args.format, args.processes, args.chunk_size)
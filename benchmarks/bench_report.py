@@ -0,0 +1,157 @@
+"""
+bench_report.py: Module to benchmark the eshopreport app against synthetic data. Times each generate_data.import_*
+step, each ReportForDate.get_* method and the full report, and writes the results to a json file so that they can be
+compared with a run from another commit.
+"""
+
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from io import StringIO
+from benchmarks import synthetic_data
+from eshopreport import app, db, generate_data
+from eshopreport.columnar import ColumnarStore
+from eshopreport.models import ReportForDate, DailyReport, Order
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import sqlalchemy
+
+# Import steps in the order generate_data.main runs them, with the csv file each reads
+IMPORT_STEPS = [('import_orders', 'orders.csv'),
+                ('import_order_lines', 'order_lines.csv'),
+                ('import_products', 'products.csv'),
+                ('import_promotions', 'promotions.csv'),
+                ('import_product_promotions', 'product_promotions.csv'),
+                ('import_commissions', 'commissions.csv')]
+
+REPORT_METHODS = ['get_total_items', 'get_total_customers', 'get_total_discount', 'get_avg_discount_rate',
+                  'get_avg_order_total', 'get_total_commissions', 'get_avg_commissions_per_order',
+                  'get_report_statistics']
+
+
+def main(lines, output, repeat=5, sample_dates=5, data_dir=None, database=None, compare=None):
+    """None: Generates lines of synthetic data (unless data_dir already holds it), imports it into a new database,
+    runs the benchmarks and writes them to the output json file. If compare names the output of a previous run, the
+    change in each timing is printed."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if data_dir is None:
+            data_dir = os.path.join(temp_dir, 'data')
+            synthetic_data.main(data_dir, lines)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + (database or os.path.join(temp_dir, 'eshop.db'))
+        db.session.remove()
+
+        results = benchmark_imports(data_dir) + benchmark_reports(repeat, sample_dates)
+        db.session.remove()
+
+    run = {"commit": get_commit(),
+           "timestamp": datetime.now(timezone.utc).isoformat(),
+           "python": platform.python_version(),
+           "sqlalchemy": sqlalchemy.__version__,
+           "parameters": {"lines": lines, "repeat": repeat, "sample_dates": sample_dates},
+           "results": results}
+    with open(output, 'w') as output_file:
+        json.dump(run, output_file, indent=2)
+
+    previous = None
+    if compare is not None:
+        with open(compare) as compare_file:
+            previous = {result["name"]: result for result in json.load(compare_file)["results"]}
+    print_results(results, previous)
+
+
+def benchmark_imports(data_dir):
+    """list: Resets the database and times each import step on the csv files in data_dir, followed by the refresh of
+    the daily report, returning a result for each"""
+    results = []
+    generate_data.reset_database()
+    touched_dates = set()
+    for name, file_name in IMPORT_STEPS:
+        path = os.path.join(data_dir, file_name)
+        start = time.perf_counter()
+        with redirect_stdout(StringIO()):
+            touched_dates |= getattr(generate_data, name)(path)
+        seconds = time.perf_counter() - start
+        with open(path) as csv_file:
+            rows = sum(1 for _ in csv_file) - 1
+        results.append({"name": name, "kind": "import", "seconds": seconds, "rows": rows,
+                        "rows_per_second": rows / seconds if seconds else None})
+
+    start = time.perf_counter()
+    generate_data.refresh_daily_report(touched_dates)
+    results.append({"name": "refresh_daily_report", "kind": "import", "seconds": time.perf_counter() - start,
+                    "rows": len(touched_dates)})
+    return results
+
+
+def benchmark_reports(repeat=5, sample_dates=5):
+    """list: Times each report method on sample_dates dates spread through the data, repeat times each, returning a
+    result for each with the timings in milliseconds"""
+    dates = sorted(row[0] for row in db.session.query(Order.created_at).distinct())
+    dates = dates[::max(1, len(dates) // sample_dates)][:sample_dates]
+
+    start = time.perf_counter()
+    store = ColumnarStore.from_database()
+    results = [{"name": "ColumnarStore.from_database", "kind": "load", "seconds": time.perf_counter() - start}]
+
+    benchmarks = [(name, "statistic", getattr(ReportForDate, name)) for name in REPORT_METHODS]
+    benchmarks.append(("ReportForDate", "report", lambda date: ReportForDate(date).get_all_results()))
+    benchmarks.append(("ReportForDate.total_items", "report", lambda date: ReportForDate(date).total_items))
+    benchmarks.append(("ReportForDate(source=DailyReport)", "report",
+                       lambda date: ReportForDate(date, source=DailyReport).get_all_results()))
+    benchmarks.append(("ReportForDate(source=ColumnarStore)", "report",
+                       lambda date: ReportForDate(date, source=store).get_all_results()))
+
+    for name, kind, function in benchmarks:
+        timings = []
+        for date in dates:
+            for i in range(repeat):
+                start = time.perf_counter()
+                function(date)
+                timings.append((time.perf_counter() - start) * 1000)
+        results.append({"name": name, "kind": kind, "runs": len(timings),
+                        "median_ms": statistics.median(timings),
+                        "mean_ms": statistics.mean(timings),
+                        "min_ms": min(timings),
+                        "max_ms": max(timings)})
+    return results
+
+
+def get_commit():
+    """str: returns the current git commit of the repository, or None if it cannot be found"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, previous=None):
+    """None: Prints each result's timing, and its ratio to the same result in previous if given"""
+    for result in results:
+        if result["kind"] in ("import", "load"):
+            value, unit, key = result["seconds"], "s", "seconds"
+        else:
+            value, unit, key = result["median_ms"], "ms", "median_ms"
+        line = f"{result['name']:<40} {value:>12.4f} {unit}"
+        if previous is not None and result["name"] in previous:
+            line += f"  ({value / previous[result['name']][key]:.2f}x previous)"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the eshopreport import and report against synthetic data")
+    parser.add_argument("--lines", type=float, default=1e5, help="number of synthetic order lines, e.g. 1e4 to 1e8")
+    parser.add_argument("--output", default="benchmark_results.json", help="json file to write the results to")
+    parser.add_argument("--repeat", type=int, default=5, help="number of times each report is timed for each date")
+    parser.add_argument("--sample-dates", type=int, default=5, help="number of dates each report is timed for")
+    parser.add_argument("--data-dir", help="directory of csv files from synthetic_data to use instead of generating")
+    parser.add_argument("--database", help="database file to import into instead of a temporary file")
+    parser.add_argument("--compare", help="results json file of a previous run to compare with")
+    args = parser.parse_args()
+    main(int(args.lines), args.output, repeat=args.repeat, sample_dates=args.sample_dates, data_dir=args.data_dir,
+         database=args.database, compare=args.compare)
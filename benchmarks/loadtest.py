@@ -0,0 +1,70 @@
+"""
+loadtest.py: Module to load test a running eshopreport app. Sends requests to a report endpoint from an increasing
+number of concurrent clients and prints the p50 and p99 latency and the requests per second at each level.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import argparse
+import json
+import statistics
+import time
+
+DEFAULT_URL = "http://127.0.0.1:5000/api/report?date=2019-08-02"
+DEFAULT_CONCURRENCY = [1, 10, 50, 100, 200]
+
+
+def main(url, concurrency_levels, requests_per_client, output=None):
+    results = []
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p99 ms':>9} {'req/sec':>9}")
+    for concurrency in concurrency_levels:
+        result = run_level(url, concurrency, requests_per_client)
+        results.append(result)
+        print(f"{result['clients']:>8} {result['requests']:>9} {result['errors']:>7} {result['p50_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['requests_per_second']:>9.1f}")
+    if output is not None:
+        with open(output, 'w') as output_file:
+            json.dump({"url": url, "results": results}, output_file, indent=2)
+
+
+def timed_request(url):
+    """(float, bool): returns the latency of a GET request to the url in milliseconds, and whether it succeeded"""
+    start = time.perf_counter()
+    try:
+        with urlopen(url) as response:
+            response.read()
+            ok = response.status == 200
+    except (HTTPError, OSError):
+        ok = False
+    return (time.perf_counter() - start) * 1000, ok
+
+
+def run_level(url, concurrency, requests_per_client):
+    """dict: Sends requests_per_client requests from each of concurrency clients at once, returning the latency
+    percentiles and throughput"""
+    total = concurrency * requests_per_client
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        timings = list(executor.map(timed_request, [url] * total))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, ok in timings)
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {"clients": concurrency,
+            "requests": total,
+            "errors": sum(1 for latency, ok in timings if not ok),
+            "p50_ms": percentiles[49],
+            "p99_ms": percentiles[98],
+            "requests_per_second": total / elapsed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a running eshopreport app")
+    parser.add_argument("--url", default=DEFAULT_URL, help="report url to request")
+    parser.add_argument("--concurrency", default=",".join(map(str, DEFAULT_CONCURRENCY)),
+                        help="comma separated numbers of concurrent clients")
+    parser.add_argument("--requests", type=int, default=20, help="number of requests sent by each client")
+    parser.add_argument("--output", help="json file to write the results to")
+    args = parser.parse_args()
+    main(args.url, [int(level) for level in args.concurrency.split(",")], args.requests, args.output)
@@ -0,0 +1,123 @@
+"""
+synthetic_data.py: Module to generate synthetic csv files with the same columns as those in eshopreport/data, at a
+configurable number of order lines, for benchmarking the eshopreport app at scale. Orders are generated in chunks and
+appended to the csv files, so memory use does not grow with the number of lines.
+"""
+
+from datetime import date
+import argparse
+import numpy as np
+import os
+import pandas as pd
+
+# Number of orders, with their order lines, generated and written at a time
+CHUNK_ORDERS = 20000
+
+VAT_RATES = [0, 0.05, 0.11, 0.2]
+
+
+def main(out_dir, lines, days=60, lines_per_order=12, vendors=9, customers=10000, products=1000, promotions=5,
+         start_date=date(2019, 8, 1), seed=0):
+    """None: Writes orders.csv, order_lines.csv, products.csv, promotions.csv, product_promotions.csv and
+    commissions.csv to out_dir, with the given number of order lines spread evenly over the orders, of at most
+    lines_per_order lines each, which are spread evenly over the days from start_date."""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, periods=days, freq='D')
+    lines_per_order = min(lines_per_order, products)
+    # Rounding up keeps every order within lines_per_order lines, so that its products are distinct
+    n_orders = max(1, -(-lines // lines_per_order))
+
+    product_ids = np.arange(1, products + 1)
+    product_descriptions = np.array([f'Product {i}' for i in product_ids], dtype=object)
+    product_prices = rng.integers(100, 100000, size=products)
+    product_vat_rates = rng.choice(VAT_RATES, size=products)
+    pd.DataFrame({'id': product_ids, 'description': product_descriptions}).to_csv(
+        os.path.join(out_dir, 'products.csv'), index=False)
+    pd.DataFrame({'id': np.arange(1, promotions + 1),
+                  'description': [f'Promotion {i}' for i in range(1, promotions + 1)]}).to_csv(
+        os.path.join(out_dir, 'promotions.csv'), index=False)
+    generate_product_promotions(rng, dates, products, promotions).to_csv(
+        os.path.join(out_dir, 'product_promotions.csv'), index=False)
+    generate_commissions(rng, dates, vendors).to_csv(os.path.join(out_dir, 'commissions.csv'), index=False)
+
+    for start in range(0, n_orders, CHUNK_ORDERS):
+        ids = np.arange(start + 1, min(start + CHUNK_ORDERS, n_orders) + 1)
+        orders = generate_orders(rng, ids, n_orders, dates, vendors, customers)
+        # The first lines % n_orders orders have one extra line, so that the total is exactly the number requested
+        line_counts = lines // n_orders + (ids <= lines % n_orders)
+        order_lines = generate_order_lines(rng, ids, line_counts, product_descriptions, product_prices,
+                                           product_vat_rates)
+        first = start == 0
+        orders.to_csv(os.path.join(out_dir, 'orders.csv'), index=False, header=first, mode='w' if first else 'a')
+        order_lines.to_csv(os.path.join(out_dir, 'order_lines.csv'), index=False, header=first,
+                           mode='w' if first else 'a')
+
+
+def generate_product_promotions(rng, dates, products, promotions, share=0.1):
+    """DataFrame: Returns a promotion for a random share of the products on each date"""
+    per_date = max(1, int(products * share))
+    return pd.DataFrame({'date': np.repeat(dates.strftime('%Y-%m-%d'), per_date),
+                         'product_id': np.concatenate([rng.choice(products, per_date, replace=False) + 1
+                                                       for _ in dates]),
+                         'promotion_id': rng.integers(1, promotions + 1, size=per_date * len(dates))})
+
+
+def generate_commissions(rng, dates, vendors):
+    """DataFrame: Returns a commission rate for every vendor on each date"""
+    return pd.DataFrame({'date': np.repeat(dates.strftime('%Y-%m-%d'), vendors),
+                         'vendor_id': np.tile(np.arange(1, vendors + 1), len(dates)),
+                         'rate': rng.integers(1, 50, size=vendors * len(dates)) / 100})
+
+
+def generate_orders(rng, ids, n_orders, dates, vendors, customers):
+    """DataFrame: Returns the orders with the given ids, out of n_orders spread evenly over the dates in id order"""
+    days = (ids - 1) * len(dates) // n_orders
+    created_at = dates[days] + pd.to_timedelta(rng.integers(0, 86400 * 10 ** 6, size=len(ids)), unit='us')
+    return pd.DataFrame({'id': ids,
+                         'created_at': created_at.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                         'vendor_id': rng.integers(1, vendors + 1, size=len(ids)),
+                         'customer_id': rng.integers(1, customers + 1, size=len(ids))})
+
+
+def generate_order_lines(rng, ids, line_counts, product_descriptions, product_prices, product_vat_rates):
+    """DataFrame: Returns line_counts order lines for each of the order ids. Each order's lines are for consecutive,
+    and so distinct, products starting from a random product."""
+    products = len(product_prices)
+    order_ids = np.repeat(ids, line_counts)
+    line_numbers = np.arange(len(order_ids)) - np.repeat(np.cumsum(line_counts) - line_counts, line_counts)
+    product_indexes = (np.repeat(rng.integers(0, products, size=len(ids)), line_counts) + line_numbers) % products
+
+    prices = product_prices[product_indexes]
+    vat_rates = product_vat_rates[product_indexes]
+    discount_rates = np.where(rng.random(len(order_ids)) < 0.7, 0, rng.uniform(0, 0.8, size=len(order_ids)))
+    quantities = rng.integers(1, 100, size=len(order_ids))
+    full_price_amounts = prices * quantities
+    discounted_amounts = full_price_amounts * (1 - discount_rates)
+    vat_amounts = discounted_amounts * vat_rates
+    return pd.DataFrame({'order_id': order_ids,
+                         'product_id': product_indexes + 1,
+                         'product_description': product_descriptions[product_indexes],
+                         'product_price': prices,
+                         'product_vat_rate': vat_rates,
+                         'discount_rate': discount_rates,
+                         'quantity': quantities,
+                         'full_price_amount': full_price_amounts,
+                         'discounted_amount': discounted_amounts,
+                         'vat_amount': vat_amounts,
+                         'total_amount': discounted_amounts + vat_amounts})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic eshop csv files for benchmarking")
+    parser.add_argument("out_dir", help="directory to write the csv files to")
+    parser.add_argument("--lines", type=float, default=1e5, help="number of order lines, e.g. 1e4 to 1e8")
+    parser.add_argument("--days", type=int, default=60, help="number of days the orders are spread over")
+    parser.add_argument("--lines-per-order", type=int, default=12, help="number of order lines in each order")
+    parser.add_argument("--vendors", type=int, default=9, help="number of vendors")
+    parser.add_argument("--customers", type=int, default=10000, help="number of customers")
+    parser.add_argument("--products", type=int, default=1000, help="number of products")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+    main(args.out_dir, int(args.lines), days=args.days, lines_per_order=args.lines_per_order, vendors=args.vendors,
+         customers=args.customers, products=args.products, seed=args.seed)
@@ -3,9 +3,30 @@ from flask_sqlalchemy import SQLAlchemy
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///eshop.db'
+# Maximum number of dates, and seconds per date, that report results are cached for
+app.config['REPORT_CACHE_SIZE'] = 1024
+app.config['REPORT_CACHE_TTL'] = 3600
+# Seconds the in-memory product promotion index is used before it is reloaded from the database
+app.config['LOOKUP_INDEX_TTL'] = 60
+# Read-only connections kept open for, and extra connections allowed by, the async report endpoint
+app.config['REPORT_POOL_SIZE'] = 10
+app.config['REPORT_POOL_MAX_OVERFLOW'] = 20
+app.config['REPORT_POOL_TIMEOUT'] = 30
+# Snapshot directory written by eshopreport.snapshot whose report store is memory-mapped at startup and serves the
+# cached reports instead of the daily_report table, or None
+app.config['REPORT_SNAPSHOT'] = None
+# Trace each report statistic and request, served at /metrics; optionally log each trace as JSON, and capture the
+# query plan of queries slower than INSTRUMENTATION_SLOW_QUERY_SECONDS
+app.config['INSTRUMENTATION'] = True
+app.config['INSTRUMENTATION_LOG_TRACES'] = False
+app.config['INSTRUMENTATION_SLOW_QUERY_SECONDS'] = 0.1
+app.config['INSTRUMENTATION_EXPLAIN_SLOW_QUERIES'] = False
 db = SQLAlchemy(app)
 
+from eshopreport import instrumentation
+
 from eshopreport import routes
+from eshopreport import async_api
 from eshopreport import generate_data
 from eshopreport import models
 
@@ -0,0 +1,98 @@
+"""
+async_api.py: Module containing the asynchronous JSON report endpoint, which reads from the database through a pool of
+read-only connections so that concurrent report requests do not wait on each other or on the app's session.
+"""
+
+from datetime import datetime
+from flask import jsonify, request
+from eshopreport import app, db
+from eshopreport.instrumentation import traced_statistic
+from eshopreport.models import Order, ReportForDate
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+import asyncio
+import threading
+
+
+class ReadOnlyReports:
+    """Class to represent a report source which runs the single-pass report query on a pool of read-only connections.
+    The connections never write; readers are not blocked while an import writes to the database as long as it is in
+    write-ahead logging (WAL) mode, which generate_data.reset_database and migrate.upgrade switch it to.
+
+          Attributes:
+              database_path (str): path of the SQLite database file
+              engine (Engine): engine holding the pool of read-only connections
+        """
+
+    def __init__(self, database_path, pool_size=10, max_overflow=20, pool_timeout=30):
+        self.database_path = database_path
+        self.engine = create_engine(f'sqlite:///file:{database_path}?mode=ro&uri=true',
+                                    poolclass=QueuePool,
+                                    pool_size=pool_size,
+                                    max_overflow=max_overflow,
+                                    pool_timeout=pool_timeout,
+                                    # Pooled connections are shared between the threads serving requests
+                                    connect_args={'check_same_thread': False})
+
+    @traced_statistic
+    def get_report_statistics(self, date):
+        """dict: returns every report statistic for the input date, calculated as by
+        ReportForDate.get_report_statistics on a pooled read-only connection. Raises IndexError if no order lines exist
+        for the date."""
+        statement = ReportForDate._aggregate_components(Order.created_at == date).statement
+        with self.engine.connect() as connection:
+            result = connection.execute(statement).all()
+        if not result or not result[0].line_count:
+            raise IndexError(f"No order lines for {date}")
+        return ReportForDate._statistics_from_components(result[0])
+
+    @traced_statistic
+    def get_statistics(self, date, fields):
+        """dict: returns at least the statistics in fields for the input date from a single query on a pooled
+        read-only connection, choosing the query as ReportForDate.get_statistics does. Raises IndexError if no order
+        lines exist for the date."""
+        group = ReportForDate.get_query_group(fields)
+        if group is None:
+            return self.get_report_statistics(date)
+        statement = ReportForDate._group_components(group, Order.created_at == date).statement
+        with self.engine.connect() as connection:
+            row = connection.execute(statement).one()
+        return ReportForDate._statistics_from_group(group, row)
+
+
+_read_only_reports = {}
+_read_only_reports_lock = threading.Lock()
+
+
+def get_read_only_reports():
+    """ReadOnlyReports: returns the read-only report source for the app's current database, creating it on first use"""
+    database_path = db.engine.url.database
+    with _read_only_reports_lock:
+        if database_path not in _read_only_reports:
+            _read_only_reports[database_path] = ReadOnlyReports(database_path,
+                                                                app.config['REPORT_POOL_SIZE'],
+                                                                app.config['REPORT_POOL_MAX_OVERFLOW'],
+                                                                app.config['REPORT_POOL_TIMEOUT'])
+        return _read_only_reports[database_path]
+
+
+@app.route("/api/report", methods=["GET"])
+async def api_report():
+    """JSON report for the date query parameter (YYYY-MM-DD), optionally limited to the comma separated statistics in
+    the fields query parameter. The report query runs in a worker thread on a pooled read-only connection, so requests
+    are served concurrently."""
+    try:
+        date = datetime.strptime(request.args.get("date", ""), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify(error="Please provide a date in the format YYYY-MM-DD"), 400
+    fields = request.args["fields"].split(",") if request.args.get("fields") else ReportForDate.fields
+    unknown = set(fields) - set(ReportForDate.fields)
+    if unknown:
+        return jsonify(error=f"Fields must be among {', '.join(ReportForDate.fields)}"), 400
+
+    reports = get_read_only_reports()
+    try:
+        results = await asyncio.to_thread(reports.get_statistics, date, fields)
+    except IndexError:
+        return jsonify(error="No data for this date."), 404
+    return jsonify(date=date.isoformat(), **{field: results[field] for field in fields})
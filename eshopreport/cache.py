@@ -0,0 +1,94 @@
+"""
+cache.py: Module containing the cache of report results used by the eshopreport app. Reports for past dates rarely
+change, so each date's results are kept in memory until they are evicted, expire or are invalidated by an import.
+"""
+
+from collections import OrderedDict
+from eshopreport import app
+from eshopreport.columnar import ColumnarStore
+from eshopreport.models import DailyReport, ReportForDate
+import os
+import threading
+import time
+
+
+class ReportCache:
+    """Class to represent a least recently used cache of report results, keyed by date.
+
+          Attributes:
+              max_size (int): maximum number of dates held; the least recently used date is evicted beyond this
+              ttl (float): number of seconds a date's results are held before they are recalculated. This bounds how
+                  long results can be stale after an import run in another process, which cannot invalidate them.
+              source: object providing get_report_statistics(date) for ReportForDate, e.g. DailyReport
+              hits (int): number of lookups answered from the cache
+              misses (int): number of lookups that calculated the report
+        """
+
+    def __init__(self, max_size=1024, ttl=3600, source=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.source = source
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()  # date -> (expiry time, results)
+        self._generation = 0  # incremented by each invalidation
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_all_results(self, date):
+        """dict: returns ReportForDate(date).get_all_results(), from the cache if the date's results have not expired.
+        Raises IndexError if no order lines exist for the date; such dates are not cached."""
+        with self._lock:
+            entry = self._entries.get(date)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(date)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+
+        results = ReportForDate(date, source=self.source).get_all_results()
+        with self._lock:
+            # Results calculated while an invalidation ran may predate it, so they are returned but not cached
+            if self._generation != generation:
+                return results
+            self._entries[date] = (self._clock() + self.ttl, results)
+            self._entries.move_to_end(date)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return results
+
+    def invalidate(self, dates=None):
+        """None: Removes the results for the given dates from the cache, or every date if none are given"""
+        with self._lock:
+            self._generation += 1
+            if dates is None:
+                self._entries.clear()
+            else:
+                for date in dates:
+                    self._entries.pop(date, None)
+
+    def get_stats(self):
+        """dict: returns the cache's hit and miss counters, hit rate and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0,
+                    "size": len(self._entries),
+                    "max_size": self.max_size,
+                    "ttl": self.ttl}
+
+
+def get_report_source():
+    """ColumnarStore or DailyReport: returns the store of the REPORT_SNAPSHOT directory memory-mapped, if one is
+    configured, otherwise DailyReport"""
+    if app.config['REPORT_SNAPSHOT']:
+        return ColumnarStore.load(os.path.join(app.config['REPORT_SNAPSHOT'], 'store'))
+    return DailyReport
+
+
+report_cache = ReportCache(app.config['REPORT_CACHE_SIZE'], app.config['REPORT_CACHE_TTL'], source=get_report_source())
@@ -0,0 +1,135 @@
+"""
+columnar.py: Module containing an in-memory columnar store of the orders, order lines and vendor commissions, which
+computes the ReportForDate statistics with vectorised NumPy reductions instead of SQL aggregation. It suits read-heavy
+use over a history that does not change; after an import the store must be rebuilt.
+"""
+
+from eshopreport import db
+from eshopreport.instrumentation import traced_statistic
+from eshopreport.lookup import lookup_index
+from eshopreport.models import Order, OrderLine
+import numpy as np
+import os
+import pandas as pd
+
+
+def read_frame(query):
+    """DataFrame: returns the rows of the query, with a column named after each of its columns"""
+    return pd.DataFrame.from_records(query.all(), columns=[column['name'] for column in query.column_descriptions])
+
+
+class ColumnarStore:
+    """Class to represent the orders and their order lines as NumPy arrays sorted by order date, then order id. Each
+    order's lines are stored contiguously in the same order, so the lines for a date are a single slice.
+
+          Attributes:
+              dates (ndarray): each distinct order date, ascending (datetime64[D])
+              date_offsets (ndarray): position of the first order of each date, followed by the number of orders, so
+                  the orders for dates[i] are date_offsets[i]:date_offsets[i + 1]
+              order_ids, customer_ids (ndarray): id and customer of each order
+              commission_rates (ndarray): the order's vendor commission rate on its date, or NaN if there is none
+              line_offsets (ndarray): position of the first line of each order, followed by the number of lines
+              quantity, discount_rate, full_price_amount, discounted_amount, total_amount (ndarray): column of
+                  each order line
+        """
+
+    # Names of the arrays that make up a store
+    ARRAYS = ['dates', 'date_offsets', 'order_ids', 'customer_ids', 'commission_rates', 'line_offsets', 'quantity',
+              'discount_rate', 'full_price_amount', 'discounted_amount', 'total_amount']
+
+    def __init__(self, **arrays):
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __repr__(self):
+        return f"ColumnarStore({len(self.dates)} dates, {len(self.order_ids)} orders, {len(self.quantity)} lines)"
+
+    @classmethod
+    def from_database(cls):
+        """ColumnarStore: loads the orders and order lines from the database into a new store, with the vendor
+        commission rates of the lookup index"""
+        orders = read_frame(db.session.query(Order.id_, Order.created_at, Order.vendor_id, Order.customer_id))
+        lines = read_frame(db.session.query(OrderLine.order_id, OrderLine.quantity, OrderLine.discount_rate,
+                                            OrderLine.full_price_amount, OrderLine.discounted_amount,
+                                            OrderLine.total_amount))
+        return cls.from_frames(orders, lines, lookup_index)
+
+    @classmethod
+    def from_frames(cls, orders, lines, commission_rates):
+        """ColumnarStore: builds a store from dataframes with the columns of the orders and order_line tables. Each
+        vendor's commission rate on a date is taken from commission_rates, any object with a get_commission_rates(date)
+        method such as lookup.LookupIndex, as in OrderTotals.refresh. Order lines whose order is missing are left
+        out."""
+        orders = orders.assign(created_at=pd.to_datetime(orders['created_at']).dt.normalize())
+        orders = orders.sort_values(['created_at', 'id_'], kind='stable', ignore_index=True)
+        dates, date_counts = np.unique(orders['created_at'].to_numpy(), return_counts=True)
+        date_offsets = np.concatenate([[0], np.cumsum(date_counts)])
+
+        # The orders of a date are contiguous, so their rates are found by mapping their vendors through its rates
+        rates = np.full(len(orders), np.nan)
+        for date, start, end in zip(pd.DatetimeIndex(dates).date, date_offsets[:-1], date_offsets[1:]):
+            rates[start:end] = orders['vendor_id'].iloc[start:end].map(commission_rates.get_commission_rates(date))
+
+        # Sort the lines by the position of their order in the sorted orders
+        order_positions = pd.Series(np.arange(len(orders)), index=orders['id_'])
+        line_orders = order_positions.reindex(lines['order_id']).to_numpy()
+        has_order = ~np.isnan(line_orders)
+        lines = lines[has_order]
+        line_orders = line_orders[has_order].astype(np.int64)
+        line_sort = np.argsort(line_orders, kind='stable')
+        lines = lines.iloc[line_sort]
+
+        line_counts = np.bincount(line_orders, minlength=len(orders))
+        return cls(dates=dates.astype('datetime64[D]'),
+                   date_offsets=date_offsets,
+                   order_ids=orders['id_'].to_numpy(np.int64),
+                   customer_ids=orders['customer_id'].to_numpy(np.int64),
+                   commission_rates=rates,
+                   line_offsets=np.concatenate([[0], np.cumsum(line_counts)]),
+                   quantity=lines['quantity'].to_numpy(np.int64),
+                   discount_rate=lines['discount_rate'].to_numpy(np.float64),
+                   full_price_amount=lines['full_price_amount'].to_numpy(np.float64),
+                   discounted_amount=lines['discounted_amount'].to_numpy(np.float64),
+                   total_amount=lines['total_amount'].to_numpy(np.float64))
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """ColumnarStore: loads a store written by save, memory-mapping each array from its .npy file (read-only by
+        default) so that no data is read until it is used"""
+        return cls(**{name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+                      for name in cls.ARRAYS})
+
+    def save(self, directory):
+        """None: Writes each array of the store to a .npy file in directory, from which load can memory-map it"""
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+
+    @traced_statistic
+    def get_report_statistics(self, date):
+        """dict: returns every report statistic for the input date, matching ReportForDate.get_report_statistics.
+        Raises IndexError if no order lines exist for the date."""
+        i = np.searchsorted(self.dates, np.datetime64(date, 'D'))
+        if i == len(self.dates) or self.dates[i] != np.datetime64(date, 'D'):
+            raise IndexError(f"No order lines for {date}")
+        first_order, end_order = self.date_offsets[i], self.date_offsets[i + 1]
+        first_line, end_line = self.line_offsets[first_order], self.line_offsets[end_order]
+        if first_line == end_line:
+            raise IndexError(f"No order lines for {date}")
+        lines = slice(first_line, end_line)
+
+        # Total the lines of each order with lines, as the reports leave out orders without any
+        order_starts = self.line_offsets[first_order:end_order] - first_line
+        has_lines = np.diff(self.line_offsets[first_order:end_order + 1]) > 0
+        order_totals = np.add.reduceat(self.total_amount[lines], order_starts[has_lines])
+        commissions = self.commission_rates[first_order:end_order][has_lines] * order_totals
+        commissions = commissions[~np.isnan(commissions)]
+
+        return {"total_items": int(self.quantity[lines].sum()),
+                "total_customers": len(np.unique(self.customer_ids[first_order:end_order])),
+                "total_discount": float((self.full_price_amount[lines] - self.discounted_amount[lines]).sum()),
+                "avg_discount_rate": float(self.discount_rate[lines].mean()),
+                "avg_order_total": float(order_totals.mean()),
+                "total_commissions": float(commissions.sum()),
+                "avg_commissions_per_order": float(commissions.mean()) if len(commissions) else 0
+                }
@@ -0,0 +1,112 @@
+"""
+export.py: Module to export the order-level figures behind the report, one row per order, as CSV or newline-delimited
+JSON (NDJSON). Rows are read from the database in batches and written as they arrive, so an export of any date range
+runs in constant memory. The /export/orders route streams an export as a download.
+"""
+
+from datetime import datetime
+from eshopreport import db
+from eshopreport.models import Order, OrderTotals
+import argparse
+import csv
+import io
+import json
+import sys
+
+# Number of rows fetched from the database, and written to the response, at a time
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = ['order_id', 'date', 'vendor_id', 'customer_id', 'total_items', 'full_price_amount',
+                  'discounted_amount', 'total_discount', 'avg_discount_rate', 'order_total', 'commission_rate',
+                  'commission']
+
+
+def query_order_rows(start, end, batch_size=EXPORT_BATCH_SIZE):
+    """Query: one row per order created from start to end inclusive, ordered by date then order id, with the columns in
+    EXPORT_COLUMNS. The figures come from OrderTotals; orders without lines have null figures. Iterating the query
+    fetches batch_size rows at a time instead of buffering the whole result."""
+    return db.session.query(
+            Order.id_,
+            Order.created_at,
+            Order.vendor_id,
+            Order.customer_id,
+            OrderTotals.quantity,
+            OrderTotals.full_price_amount,
+            OrderTotals.discounted_amount,
+            OrderTotals.full_price_amount - OrderTotals.discounted_amount,
+            OrderTotals.discount_rate_sum / OrderTotals.line_count,
+            OrderTotals.total_amount,
+            OrderTotals.commission_rate,
+            OrderTotals.commission_rate * OrderTotals.total_amount
+        ).outerjoin(OrderTotals, OrderTotals.order_id == Order.id_
+        ).filter(Order.created_at.between(start, end)
+        ).order_by(Order.created_at, Order.id_
+        ).yield_per(batch_size)
+
+
+def iter_csv(rows, batch_size=EXPORT_BATCH_SIZE):
+    """generator: Yields the rows as CSV text with a header line, batch_size rows at a time. Nulls are written as
+    empty fields."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(EXPORT_COLUMNS)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(format_row(row))
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, batch_size=EXPORT_BATCH_SIZE):
+    """generator: Yields the rows as NDJSON, one object per line, batch_size rows at a time"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, format_row(row)))) + '\n')
+        if len(lines) == batch_size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+def format_row(row):
+    """tuple: returns the row with its date as YYYY-MM-DD"""
+    return (row[0], row[1].isoformat()) + tuple(row[2:])
+
+
+# Writer, mimetype and file extension of each export format
+FORMATS = {'csv': (iter_csv, 'text/csv', 'csv'),
+           'ndjson': (iter_ndjson, 'application/x-ndjson', 'ndjson')}
+
+
+def write_export(start, end, output, export_format='csv'):
+    """int: Writes the order-level figures for every order created from start to end inclusive to the output file
+    object in the given format, returning the number of orders written"""
+    writer = FORMATS[export_format][0]
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    for text in writer(counted(query_order_rows(start, end))):
+        output.write(text)
+    return count
+
+
+if __name__ == "__main__":
+    def parse_date(value):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+    parser = argparse.ArgumentParser(description="Export the order-level report figures for a date range")
+    parser.add_argument("start", type=parse_date, help="first order date, YYYY-MM-DD")
+    parser.add_argument("end", type=parse_date, nargs="?", help="last order date, YYYY-MM-DD (default: start)")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv")
+    parser.add_argument("--output", help="file to write to instead of standard output")
+    args = parser.parse_args()
+    with open(args.output, 'w', newline='') if args.output else sys.stdout as output_file:
+        rows = write_export(args.start, args.end or args.start, output_file, args.format)
+    print(f"Exported {rows:,} orders", file=sys.stderr)
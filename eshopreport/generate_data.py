@@ -3,111 +3,442 @@ generate_date.py: Module to generate the data for the Flask sqlite database (esh
 from each csv file in eshopreport/data.
 """
 
-from datetime import datetime
-from eshopreport.models import Order, OrderLine, Promotion, ProductPromotion, Product, VendorCommissions
+from eshopreport.models import Order, OrderLine, Promotion, ProductPromotion, Product, VendorCommissions, DailyReport, \
+    ImportCheckpoint, OrderTotals, IN_CLAUSE_BATCH_SIZE
 from eshopreport import db
+from eshopreport.cache import report_cache
+from eshopreport.lookup import lookup_index
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 import pandas as pd
-
-
-def main():
-    reset_database()
-
-    import_orders()
-    import_order_lines()
-    import_products()
-    import_promotions()
-    import_product_promotions()
-    import_commissions()
-
-
-def import_products():
-    """None: Imports all items from data/products.csv to database"""
-    products = []
-    df = pd.read_csv('eshopreport/data/products.csv')
-
-    for index, row in df.iterrows():
-        product_i = Product(row['id'], row['description'])
-        products.append(product_i)
-    db.session.add_all(products)
-    db.session.commit()
-
-
-def import_promotions():
-    """None: Imports all items from data/promotions.csv to database"""
-    promotions = []
-    df = pd.read_csv('eshopreport/data/promotions.csv')
-
-    for index, row in df.iterrows():
-        promotion_i = Promotion(row['id'], row['description'])
-        promotions.append(promotion_i)
-
-    db.session.add_all(promotions)
-    db.session.commit()
-
-
-def import_product_promotions():
-    """None: Imports all items from data/product_promotions.csv to database"""
-    product_promotions = []
-    df = pd.read_csv('eshopreport/data/product_promotions.csv')
-
-    for index, row in df.iterrows():
-        date = datetime.strptime(row['date'], '%Y-%m-%d').date()
-        product_promotion_i = ProductPromotion(row['product_id'], date, row['promotion_id'])
-        product_promotions.append(product_promotion_i)
-
-    db.session.add_all(product_promotions)
-    db.session.commit()
-
-
-def import_commissions():
-    """None: Imports all items from data/commissions.csv to database"""
-    commissions = []
-    df = pd.read_csv('eshopreport/data/commissions.csv')
-
-    for index, row in df.iterrows():
-        date = datetime.strptime(row['date'], '%Y-%m-%d').date()
-        commission_i = VendorCommissions(row['vendor_id'], date, row['rate'])
-        commissions.append(commission_i)
-
-    db.session.add_all(commissions)
-    db.session.commit()
-
-
-def import_orders():
-    """None: Imports all items from data/orders.csv to database"""
-    orders = []
-    df = pd.read_csv('eshopreport/data/orders.csv')
-
-    for index, row in df.iterrows():
-        date = datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S.%f').date()
-        order_i = Order(row['id'], date, row['vendor_id'], row['customer_id'])
-        orders.append(order_i)
-
-    db.session.add_all(orders)
+import argparse
+import io
+import logging
+import os
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+ORDERS_CSV = os.path.join(DATA_DIR, 'orders.csv')
+ORDER_LINES_CSV = os.path.join(DATA_DIR, 'order_lines.csv')
+PRODUCTS_CSV = os.path.join(DATA_DIR, 'products.csv')
+PROMOTIONS_CSV = os.path.join(DATA_DIR, 'promotions.csv')
+PRODUCT_PROMOTIONS_CSV = os.path.join(DATA_DIR, 'product_promotions.csv')
+COMMISSIONS_CSV = os.path.join(DATA_DIR, 'commissions.csv')
+
+# Number of rows sent to the database in each executemany call
+BULK_INSERT_CHUNK_SIZE = 10000
+
+# Number of bytes of a csv file parsed by a worker process at a time in a parallel import
+PARALLEL_CHUNK_BYTES = 16 * 1024 ** 2
+
+# Number of chunks parsed ahead of the writer per worker process in a parallel import, bounding the memory held
+PARALLEL_PENDING_CHUNKS = 2
+
+# Ratio of the memory used while importing a chunk to the size of the chunk's dataframe, allowing for the converted
+# columns and the row tuples passed to the database
+CHUNK_MEMORY_OVERHEAD = 4
+
+ORDER_DTYPES = {'id': 'int64', 'created_at': 'str', 'vendor_id': 'int64', 'customer_id': 'int64'}
+ORDER_LINE_DTYPES = {'order_id': 'int64', 'product_id': 'int64', 'product_description': 'str',
+                     'product_price': 'float64', 'product_vat_rate': 'float64', 'discount_rate': 'float64',
+                     'quantity': 'int64', 'full_price_amount': 'float64', 'discounted_amount': 'float64',
+                     'vat_amount': 'float64', 'total_amount': 'float64'}
+PRODUCT_DTYPES = {'id': 'int64', 'description': 'str'}
+PROMOTION_DTYPES = {'id': 'int64', 'description': 'str'}
+PRODUCT_PROMOTION_DTYPES = {'date': 'str', 'product_id': 'int64', 'promotion_id': 'int64'}
+COMMISSION_DTYPES = {'date': 'str', 'vendor_id': 'int64', 'rate': 'float64'}
+
+logger = logging.getLogger(__name__)
+
+
+class ImportRates:
+    """Class to represent the rows inserted into each table by an import and the seconds spent inserting them, so that
+    the rate is reported once per table however many chunks it was written in.
+
+          Attributes:
+              totals (dict): table name -> [rows, seconds]
+        """
+
+    def __init__(self):
+        self.totals = defaultdict(lambda: [0, 0.0])
+
+    def add(self, table, rows, seconds):
+        """None: Adds the rows inserted into the table by one bulk_insert call and the time it took"""
+        totals = self.totals[table.name]
+        totals[0] += rows
+        totals[1] += seconds
+
+    def report(self):
+        """None: Prints the rows/sec achieved for each table, in the order they were first written"""
+        for table_name, (rows, seconds) in self.totals.items():
+            print(f"Imported {rows:,} rows into {table_name} in {seconds:.2f}s "
+                  f"({rows / seconds if seconds else 0:,.0f} rows/sec)")
+
+
+def main(memory_limit=None, resume=False, processes=None):
+    """None: Resets the database and imports every csv file in data/. If a memory_limit (in bytes) is given, each file
+    is streamed in chunks sized to stay within it and every chunk is committed along with a checkpoint. With
+    resume=True the database is not reset and an interrupted import continues from those checkpoints. If a number of
+    processes is given, the files are parsed across that many worker processes instead (see import_parallel)."""
+    if resume:
+        db.create_all()
+    else:
+        reset_database()
+
+    if processes is not None:
+        chunk_bytes = PARALLEL_CHUNK_BYTES if memory_limit is None else \
+            max(1, memory_limit // (CHUNK_MEMORY_OVERHEAD * PARALLEL_PENDING_CHUNKS * processes))
+        touched_dates = import_parallel(processes, chunk_bytes, resume)
+        refresh_daily_report(None if resume else touched_dates)
+        return
+
+    def chunk_size(path, dtype):
+        return None if memory_limit is None else get_chunk_size(path, dtype, memory_limit)
+
+    # Dates whose daily report is affected by the imported rows
+    touched_dates = set()
+    for import_csv, path, dtype in [(import_orders, ORDERS_CSV, ORDER_DTYPES),
+                                    (import_order_lines, ORDER_LINES_CSV, ORDER_LINE_DTYPES),
+                                    (import_products, PRODUCTS_CSV, PRODUCT_DTYPES),
+                                    (import_promotions, PROMOTIONS_CSV, PROMOTION_DTYPES),
+                                    (import_product_promotions, PRODUCT_PROMOTIONS_CSV, PRODUCT_PROMOTION_DTYPES),
+                                    (import_commissions, COMMISSIONS_CSV, COMMISSION_DTYPES)]:
+        touched_dates |= import_csv(path, chunk_size=chunk_size(path, dtype), resume=resume)
+
+    # Rows imported before an interruption are not known here, so a resumed import refreshes every date
+    refresh_daily_report(None if resume else touched_dates)
+
+
+def import_products(path=PRODUCTS_CSV, chunk_size=None, resume=False):
+    """set: Imports all items from data/products.csv to database. No dates are affected, so an empty set is returned"""
+    rates = ImportRates()
+    for df, rows_read in read_csv_chunks(path, PRODUCT_DTYPES, chunk_size, resume):
+        bulk_insert(Product.__table__, convert_products(df)[0], checkpoint=(path, rows_read), rates=rates)
+    rates.report()
+    return set()
+
+
+def import_promotions(path=PROMOTIONS_CSV, chunk_size=None, resume=False):
+    """set: Imports all items from data/promotions.csv to database. No dates are affected, so an empty set is
+    returned"""
+    rates = ImportRates()
+    for df, rows_read in read_csv_chunks(path, PROMOTION_DTYPES, chunk_size, resume):
+        bulk_insert(Promotion.__table__, convert_promotions(df)[0], checkpoint=(path, rows_read), rates=rates)
+    rates.report()
+    return set()
+
+
+def import_product_promotions(path=PRODUCT_PROMOTIONS_CSV, chunk_size=None, resume=False):
+    """set: Imports all items from data/product_promotions.csv to database and returns the dates they apply to"""
+    rates = ImportRates()
+    touched_dates = set()
+    for df, rows_read in read_csv_chunks(path, PRODUCT_PROMOTION_DTYPES, chunk_size, resume):
+        df, dates = convert_product_promotions(df)
+        bulk_insert(ProductPromotion.__table__, df, checkpoint=(path, rows_read), rates=rates)
+        touched_dates |= dates
+    rates.report()
+    return touched_dates
+
+
+def import_commissions(path=COMMISSIONS_CSV, chunk_size=None, resume=False):
+    """set: Imports all items from data/commissions.csv to database and returns the dates they apply to"""
+    rates = ImportRates()
+    touched_dates = set()
+    for df, rows_read in read_csv_chunks(path, COMMISSION_DTYPES, chunk_size, resume):
+        df, dates = convert_commissions(df)
+        bulk_insert(VendorCommissions.__table__, df, checkpoint=(path, rows_read), rates=rates)
+        touched_dates |= dates
+    rates.report()
+    return touched_dates
+
+
+def import_orders(path=ORDERS_CSV, chunk_size=None, resume=False):
+    """set: Imports all items from data/orders.csv to database and returns the dates the orders were created"""
+    rates = ImportRates()
+    touched_dates = set()
+    for df, rows_read in read_csv_chunks(path, ORDER_DTYPES, chunk_size, resume):
+        df, dates = convert_orders(df)
+        bulk_insert(Order.__table__, df, checkpoint=(path, rows_read), rates=rates)
+        touched_dates |= dates
+    rates.report()
+    return touched_dates
+
+
+def import_order_lines(path=ORDER_LINES_CSV, chunk_size=None, resume=False):
+    """set: Imports all items from data/order_lines.csv to database and returns the dates of their orders"""
+    rates = ImportRates()
+    touched_dates = set()
+    for df, rows_read in read_csv_chunks(path, ORDER_LINE_DTYPES, chunk_size, resume):
+        bulk_insert(OrderLine.__table__, df, checkpoint=(path, rows_read), rates=rates)
+        touched_dates |= get_order_dates(df['order_id'].unique().tolist())
+    rates.report()
+    return touched_dates
+
+
+def convert_orders(df):
+    """(DataFrame, set): Returns a chunk of orders.csv with the orders table's column names and stored date format,
+    and the dates the orders were created"""
+    dates = parse_dates(df['created_at'], '%Y-%m-%d %H:%M:%S.%f')
+    df = df.assign(created_at=format_dates(dates)).rename(columns={'id': 'id_'})
+    return df, set(dates.drop_duplicates().dt.date)
+
+
+def convert_order_lines(df):
+    """(DataFrame, set): Returns a chunk of order_lines.csv, whose columns match the order_line table, and an empty set
+    as the dates of its orders are only known to the database"""
+    return df, set()
+
+
+def convert_products(df):
+    """(DataFrame, set): Returns a chunk of products.csv with the products table's column names. No dates are
+    affected, so an empty set is returned."""
+    return df.rename(columns={'id': 'id_'}), set()
+
+
+def convert_promotions(df):
+    """(DataFrame, set): Returns a chunk of promotions.csv with the promotions table's column names. No dates are
+    affected, so an empty set is returned."""
+    return df.rename(columns={'id': 'id_'}), set()
+
+
+def convert_product_promotions(df):
+    """(DataFrame, set): Returns a chunk of product_promotions.csv with the product_promotion table's columns and
+    stored date format, and the dates the promotions apply to"""
+    dates = parse_dates(df['date'], '%Y-%m-%d')
+    df = df.assign(date=format_dates(dates))
+    return df[['product_id', 'date', 'promotion_id']], set(dates.drop_duplicates().dt.date)
+
+
+def convert_commissions(df):
+    """(DataFrame, set): Returns a chunk of commissions.csv with the vendor_commissions table's columns and stored date
+    format, and the dates the commissions apply to"""
+    dates = parse_dates(df['date'], '%Y-%m-%d')
+    df = df.assign(date=format_dates(dates))
+    return df[['vendor_id', 'date', 'rate']], set(dates.drop_duplicates().dt.date)
+
+
+# Csv file, column types, table and converter of each import, in the order main runs them
+IMPORTS = [(ORDERS_CSV, ORDER_DTYPES, Order.__table__, convert_orders),
+           (ORDER_LINES_CSV, ORDER_LINE_DTYPES, OrderLine.__table__, convert_order_lines),
+           (PRODUCTS_CSV, PRODUCT_DTYPES, Product.__table__, convert_products),
+           (PROMOTIONS_CSV, PROMOTION_DTYPES, Promotion.__table__, convert_promotions),
+           (PRODUCT_PROMOTIONS_CSV, PRODUCT_PROMOTION_DTYPES, ProductPromotion.__table__, convert_product_promotions),
+           (COMMISSIONS_CSV, COMMISSION_DTYPES, VendorCommissions.__table__, convert_commissions)]
+
+
+def import_parallel(processes=None, chunk_bytes=PARALLEL_CHUNK_BYTES, resume=False, imports=IMPORTS):
+    """set: Imports each (path, dtype, table, convert) csv file in imports, parsing and converting their chunks of
+    about chunk_bytes across a pool of worker processes (one per core by default). This process is the single writer:
+    it bulk inserts each converted chunk, with a checkpoint, as soon as it and the file's earlier chunks are ready.
+    The files' chunks are interleaved, so small independent tables such as products and commissions load while the
+    order lines are still being parsed. With resume=True the rows recorded by each file's ImportCheckpoint are skipped.
+    Returns the dates of the imported orders and commissions; the dates of order lines are not looked up, as their
+    orders are imported in the same run."""
+    processes = processes or os.cpu_count()
+    files = {path: (dtype, table, convert) for path, dtype, table, convert in imports}
+    skip = {path: ImportCheckpoint.get_rows_imported(path) if resume else 0 for path in files}
+    rows_read = dict.fromkeys(files, 0)
+
+    # Take a chunk from each file in turn, and keep each file's submitted chunks in order
+    file_ranges = [deque((path, start, end) for start, end in split_csv(path, chunk_bytes)) for path in files]
+    tasks = deque()
+    while any(file_ranges):
+        tasks.extend(ranges.popleft() for ranges in file_ranges if ranges)
+    pending = {path: deque() for path in files}
+
+    touched_dates = set()
+    rates = ImportRates()
+    with ProcessPoolExecutor(processes) as executor:
+        while tasks or any(pending.values()):
+            while tasks and sum(map(len, pending.values())) < processes * PARALLEL_PENDING_CHUNKS:
+                path, start, end = tasks.popleft()
+                dtype, table, convert = files[path]
+                pending[path].append(executor.submit(parse_csv_range, path, start, end, dtype, convert))
+
+            heads = {futures[0]: path for path, futures in pending.items() if futures}
+            done, _ = wait(heads, return_when=FIRST_COMPLETED)
+            for future in done:
+                path = heads[future]
+                pending[path].popleft()
+                df, dates = future.result()
+                first_row = rows_read[path]
+                rows_read[path] += len(df)
+                if rows_read[path] <= skip[path]:
+                    continue
+                bulk_insert(files[path][1], df.iloc[max(0, skip[path] - first_row):],
+                            checkpoint=(path, rows_read[path]), rates=rates)
+                touched_dates |= dates
+    rates.report()
+    return touched_dates
+
+
+def split_csv(path, chunk_bytes):
+    """list: Returns (start, end) byte offsets dividing the rows of the csv file after its header into ranges of about
+    chunk_bytes, each ending at a line break. Quoted fields must not contain line breaks."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as csv_file:
+        csv_file.readline()
+        start = csv_file.tell()
+        while start < size:
+            csv_file.seek(min(start + chunk_bytes, size))
+            csv_file.readline()
+            end = csv_file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def parse_csv_range(path, start, end, dtype, convert):
+    """(DataFrame, set): Parses the rows of the csv file between the byte offsets, naming the columns from its header,
+    and returns them converted by convert. This runs in the worker processes of import_parallel."""
+    columns = pd.read_csv(path, nrows=0).columns
+    with open(path, 'rb') as csv_file:
+        csv_file.seek(start)
+        data = csv_file.read(end - start)
+    return convert(pd.read_csv(io.BytesIO(data), names=columns, header=None, dtype=dtype))
+
+
+def append(orders_path=ORDERS_CSV, order_lines_path=ORDER_LINES_CSV, chunk_size=None):
+    """set: Imports new and changed orders and order lines, such as a daily delta export, without resetting the
+    database, then refreshes the daily report for the dates affected and returns them. Rows for orders above the
+    high-water mark (the highest order id already imported) are inserted directly. Rows at or below it are upserted on
+    Order.id_ or the (order_id, product_id) natural key of an order line, and only written if a value has changed."""
+    db.create_all()
+    for index in OrderLine.__table__.indexes:
+        index.create(db.session.connection(), checkfirst=True)
+    high_water_mark = db.session.query(func.max(Order.id_)).scalar() or 0
+
+    touched_dates = set()
+    rates = ImportRates()
+    for df, rows_read in read_csv_chunks(orders_path, ORDER_DTYPES, chunk_size):
+        df = df.rename(columns={'id': 'id_'})
+        dates = parse_dates(df['created_at'], '%Y-%m-%d %H:%M:%S.%f')
+        df['created_at'] = format_dates(dates)
+        is_new = df['id_'] > high_water_mark
+        # An existing order may be moved to another date, so its current date is affected too
+        touched_dates |= get_order_dates(df.loc[~is_new, 'id_'].tolist())
+        touched_dates |= set(dates.drop_duplicates().dt.date)
+        bulk_insert(Order.__table__, df[is_new], rates=rates)
+        bulk_insert(Order.__table__, df[~is_new], upsert_key=['id_'], rates=rates)
+
+    for df, rows_read in read_csv_chunks(order_lines_path, ORDER_LINE_DTYPES, chunk_size):
+        is_new = df['order_id'] > high_water_mark
+        touched_dates |= get_order_dates(df['order_id'].unique().tolist())
+        bulk_insert(OrderLine.__table__, df[is_new], rates=rates)
+        bulk_insert(OrderLine.__table__, df[~is_new], upsert_key=['order_id', 'product_id'], rates=rates)
+    rates.report()
+
+    refresh_daily_report(touched_dates)
+    return touched_dates
+
+
+def read_csv_chunks(path, dtype, chunk_size=None, resume=False):
+    """generator: Yields a (DataFrame, rows_read) pair for each chunk of chunk_size rows in the csv file, or a single
+    pair for the whole file if chunk_size is None. rows_read is the number of rows of the file read up to the end of
+    the chunk. With resume=True, the rows recorded by the file's ImportCheckpoint are skipped."""
+    skip = ImportCheckpoint.get_rows_imported(path) if resume else 0
+    # A callable is used rather than a list of row numbers so that skipping does not use memory per row
+    skiprows = (lambda i: 0 < i <= skip) if skip else None
+    if chunk_size is None:
+        df = pd.read_csv(path, dtype=dtype, skiprows=skiprows)
+        yield df, skip + len(df)
+        return
+
+    rows_read = skip
+    for df in pd.read_csv(path, dtype=dtype, skiprows=skiprows, chunksize=chunk_size):
+        rows_read += len(df)
+        yield df, rows_read
+
+
+def get_chunk_size(path, dtype, memory_limit, sample_rows=1000):
+    """int: Returns the number of rows of the csv file that can be read and imported in one chunk without exceeding
+    memory_limit bytes, estimated from the in-memory size of a sample of its rows."""
+    sample = pd.read_csv(path, dtype=dtype, nrows=sample_rows)
+    if sample.empty:
+        return 1
+    row_bytes = sample.memory_usage(deep=True, index=False).sum() / len(sample)
+    return max(1, int(memory_limit / (row_bytes * CHUNK_MEMORY_OVERHEAD)))
+
+
+def parse_dates(column, date_format):
+    """Series: Parses a column of date or datetime strings in one vectorised pass, truncating each value to its date"""
+    return pd.to_datetime(column, format=date_format).dt.normalize()
+
+
+def format_dates(column):
+    """Series: Formats a column of parsed dates as the YYYY-MM-DD strings that SQLite stores date columns as"""
+    return column.dt.strftime('%Y-%m-%d')
+
+
+def bulk_insert(table, df, chunk_size=BULK_INSERT_CHUNK_SIZE, checkpoint=None, upsert_key=None, rates=None):
+    """int: Inserts each row of the dataframe into the table with chunked executemany calls in a single transaction,
+    bypassing the ORM. The rows and time taken are added to rates, an ImportRates reported by the caller once the whole
+    table is written, or if none is given the rows/sec achieved is printed. The dataframe columns must be named after
+    the table's columns and hold values in their stored format. If an upsert_key (list of column names with a unique index) is given, a row
+    matching an existing row on the key updates it instead, when any of its values differ. If a (path, rows_read)
+    checkpoint is given, it is recorded as an ImportCheckpoint in the same transaction. Returns the number of rows
+    inserted or upserted."""
+    start = time.perf_counter()
+    # The statement lists its columns in the table's order, so the values are bound in that order too
+    df = df[[column.name for column in table.columns if column.name in df.columns]]
+    statement = sqlite_insert(table)
+    if upsert_key is not None:
+        updated = {column: statement.excluded[column] for column in df.columns if column not in upsert_key}
+        statement = statement.on_conflict_do_update(
+            index_elements=upsert_key,
+            set_=updated,
+            where=or_(*[table.c[column].is_distinct_from(value) for column, value in updated.items()]))
+    statement = str(statement.compile(dialect=db.engine.dialect, column_keys=list(df.columns)))
+    connection = db.session.connection()
+    for i in range(0, len(df), chunk_size):
+        connection.exec_driver_sql(statement, list(df.iloc[i:i + chunk_size].itertuples(index=False, name=None)))
+    if checkpoint is not None:
+        db.session.merge(ImportCheckpoint(*checkpoint))
     db.session.commit()
 
-
-def import_order_lines():
-    """None: Imports all items from data/order_lines.csv to database"""
-    order_lines = []
-    df = pd.read_csv('eshopreport/data/order_lines.csv')
-
-    for index, row in df.iterrows():
-        order_line_i = OrderLine(row['order_id'],
-                                 row['product_id'],
-                                 row['product_description'],
-                                 row['product_price'],
-                                 row['product_vat_rate'],
-                                 row['discount_rate'],
-                                 row['quantity'],
-                                 row['full_price_amount'],
-                                 row['discounted_amount'],
-                                 row['vat_amount'],
-                                 row['total_amount'])
-        order_lines.append(order_line_i)
-
-    db.session.add_all(order_lines)
+    elapsed = time.perf_counter() - start
+    logger.debug("Inserted %d rows into %s in %.3fs", len(df), table.name, elapsed)
+    if rates is None:
+        single_call = ImportRates()
+        single_call.add(table, len(df), elapsed)
+        single_call.report()
+    else:
+        rates.add(table, len(df), elapsed)
+    return len(df)
+
+
+def get_order_dates(order_ids):
+    """set: Returns the distinct dates on which the given orders were created"""
+    order_ids = list(order_ids)
+    dates = set()
+    for i in range(0, len(order_ids), IN_CLAUSE_BATCH_SIZE):
+        batch = order_ids[i:i + IN_CLAUSE_BATCH_SIZE]
+        dates.update(row[0] for row in db.session.query(Order.created_at).filter(Order.id_.in_(batch)).distinct())
+    return dates
+
+
+def refresh_daily_report(dates=None):
+    """None: Recomputes the order_totals rows for the orders on the given dates, then the daily_report rows for those
+    dates, or for every date with orders if none are given, so that only the dates touched by an import are
+    re-aggregated. The dates' partitions of the lookup index are reloaded first, as the order totals take their
+    commission rates from it, and cached reports for those dates are invalidated."""
+    if dates is None:
+        dates = {row[0] for row in db.session.query(Order.created_at).distinct()}
+        dates |= {row[0] for row in db.session.query(DailyReport.date)}
+        # Commissions and promotions may exist for dates without orders, so the whole index is reloaded
+        lookup_index.invalidate()
+    else:
+        lookup_index.refresh(dates)
+    # The order totals take their commission rates from the lookup index, and the daily report is aggregated from the
+    # order totals, so each is refreshed before the next
+    OrderTotals.refresh(dates, lookup_index)
+    DailyReport.refresh(dates)
     db.session.commit()
+    report_cache.invalidate(dates)
 
 
 def reset_database():
@@ -120,7 +451,30 @@ def reset_database():
     db.session.commit()
 
     db.create_all()
+    enable_wal_mode()
+    lookup_index.invalidate()
+
+
+def enable_wal_mode():
+    """None: Switches the app's database to write-ahead logging (WAL), which persists in the database file, so that
+    the read-only report connections are not blocked while an import writes"""
+    with db.engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA journal_mode=WAL')
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Import the csv files in eshopreport/data into the database")
+    parser.add_argument("--memory-limit", type=int, help="stream each file in chunks using at most this many MB")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted import from its checkpoints")
+    parser.add_argument("--processes", type=int, help="parse the csv files across this many worker processes")
+    parser.add_argument("--append", action="store_true",
+                        help="import new and changed orders and order lines without resetting the database")
+    parser.add_argument("--orders", default=ORDERS_CSV, help="orders csv file to append")
+    parser.add_argument("--order-lines", default=ORDER_LINES_CSV, help="order lines csv file to append")
+    args = parser.parse_args()
+    memory_limit = args.memory_limit * 1024 ** 2 if args.memory_limit else None
+    if args.append:
+        append(args.orders, args.order_lines,
+               chunk_size=memory_limit and get_chunk_size(args.order_lines, ORDER_LINE_DTYPES, memory_limit))
+    else:
+        main(memory_limit=memory_limit, resume=args.resume, processes=args.processes)
\ No newline at end of file
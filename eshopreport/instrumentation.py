@@ -0,0 +1,250 @@
+"""
+instrumentation.py: Module containing the query-level instrumentation of the eshopreport app. Each report statistic and
+each request is traced, recording its wall time and the SQL text, row count and duration of every query it runs, taken
+from SQLAlchemy engine events. The totals are served in Prometheus text format at /metrics, and each trace
+can also be logged as a JSON line.
+"""
+
+from collections import defaultdict
+from contextvars import ContextVar
+from flask import g, request
+from eshopreport import app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import functools
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Traces the current code is running within, innermost last. A query is recorded in all of them.
+_active_traces = ContextVar('active_traces', default=())
+
+
+class Trace:
+    """Class to represent one timed run of a statistic or a request.
+
+          Attributes:
+              kind (str): what was traced, "statistic" or "request"
+              labels (dict): labels identifying it, e.g. {"statistic": "ReportForDate.get_total_items"}
+              queries (list): a dict for each query run, holding its statement, seconds, rows fetched or changed,
+                  whether it was an executemany, and its query plan if it was slow and EXPLAIN capture is enabled
+              seconds (float): wall time, set when the trace finishes
+        """
+
+    def __init__(self, kind, **labels):
+        self.kind = kind
+        self.labels = labels
+        self.queries = []
+        self.seconds = None
+        self._start = time.perf_counter()
+        self._token = None
+
+    def __enter__(self):
+        self._token = _active_traces.set(_active_traces.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_traces.reset(self._token)
+        self.finish()
+
+    def finish(self):
+        """None: Stops the clock and adds the trace to the metrics, logging it if INSTRUMENTATION_LOG_TRACES is set"""
+        self.seconds = time.perf_counter() - self._start
+        metrics.add(self)
+        if app.config['INSTRUMENTATION_LOG_TRACES']:
+            logger.info(json.dumps(self.to_dict(), default=str))
+
+    def to_dict(self):
+        """dict: returns the trace as a dictionary for structured logging"""
+        return {"kind": self.kind,
+                **self.labels,
+                "seconds": self.seconds,
+                "round_trips": len(self.queries),
+                "rows": sum(query["rows"] for query in self.queries),
+                "queries": self.queries}
+
+
+class Metrics:
+    """Class to represent the running totals of every trace, per kind and labels, as Prometheus summaries and
+    counters.
+
+          Attributes:
+              totals (dict): (kind, labels) -> dict of count, seconds, round_trips, rows and query_seconds
+              slow_queries (int): number of queries slower than INSTRUMENTATION_SLOW_QUERY_SECONDS
+        """
+
+    # Metric suffix, Prometheus type and help text for each total
+    FAMILIES = [('seconds', 'summary', 'Wall time of each {kind}'),
+                ('round_trips_total', 'counter', 'Database round trips made by each {kind}'),
+                ('rows_total', 'counter', 'Rows returned or changed by the queries of each {kind}'),
+                ('query_seconds_total', 'counter', 'Time spent in the database by each {kind}')]
+
+    def __init__(self):
+        self.totals = defaultdict(lambda: {"count": 0, "seconds": 0.0, "round_trips": 0, "rows": 0,
+                                           "query_seconds": 0.0})
+        self.slow_queries = 0
+        self._lock = threading.Lock()
+
+    def add(self, trace):
+        """None: Adds a finished trace to the totals for its kind and labels"""
+        with self._lock:
+            totals = self.totals[(trace.kind, tuple(sorted(trace.labels.items())))]
+            totals["count"] += 1
+            totals["seconds"] += trace.seconds
+            totals["round_trips"] += len(trace.queries)
+            totals["rows"] += sum(query["rows"] for query in trace.queries)
+            totals["query_seconds"] += sum(query["seconds"] for query in trace.queries)
+
+    def add_slow_query(self):
+        """None: Counts a query slower than the threshold"""
+        with self._lock:
+            self.slow_queries += 1
+
+    def reset(self):
+        """None: Clears every total"""
+        with self._lock:
+            self.totals.clear()
+            self.slow_queries = 0
+
+    def render(self):
+        """str: returns the totals in the Prometheus text exposition format"""
+        with self._lock:
+            totals = sorted(self.totals.items())
+            slow_queries = self.slow_queries
+
+        lines = []
+        for kind in sorted({kind for (kind, labels), values in totals}):
+            for suffix, metric_type, help_text in self.FAMILIES:
+                name = f"eshopreport_{kind}_{suffix}"
+                lines.append(f"# HELP {name} {help_text.format(kind=kind)}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for (total_kind, labels), values in totals:
+                    if total_kind != kind:
+                        continue
+                    label_text = format_labels(labels)
+                    if suffix == 'seconds':
+                        lines.append(f"{name}_count{label_text} {values['count']}")
+                        lines.append(f"{name}_sum{label_text} {values['seconds']!r}")
+                    else:
+                        lines.append(f"{name}{label_text} {values[suffix[:-len('_total')]]!r}")
+        lines.append("# HELP eshopreport_slow_queries_total Queries slower than the slow query threshold")
+        lines.append("# TYPE eshopreport_slow_queries_total counter")
+        lines.append(f"eshopreport_slow_queries_total {slow_queries}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def format_labels(labels):
+    """str: returns the (name, value) pairs as a Prometheus label set, escaping the values"""
+    escaped = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def traced_statistic(function):
+    """Decorator which traces each call of a report statistic function, labelled with its qualified name"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not app.config['INSTRUMENTATION']:
+            return function(*args, **kwargs)
+        with Trace("statistic", statistic=function.__qualname__):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+@app.before_request
+def start_request_trace():
+    if app.config['INSTRUMENTATION']:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        g.trace = Trace("request", route=route, method=request.method)
+        _active_traces.set(_active_traces.get() + (g.trace,))
+
+
+@app.after_request
+def record_response_status(response):
+    if "trace" in g:
+        g.trace.labels["status"] = response.status_code
+    return response
+
+
+@app.teardown_request
+def finish_request_trace(exception=None):
+    if "trace" in g:
+        trace = g.pop("trace")
+        _active_traces.set(tuple(active for active in _active_traces.get() if active is not trace))
+        trace.labels.setdefault("status", 500)
+        trace.finish()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query(connection, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - connection.info["query_start"].pop()
+    traces = _active_traces.get()
+    if not traces:
+        return
+
+    query = {"statement": statement,
+             "seconds": seconds,
+             "rows": max(cursor.rowcount, 0),
+             "executemany": executemany}
+    if cursor.description is not None:
+        # Rows are counted as the result fetches them, which includes streamed results
+        context.cursor = RowCountingCursor(cursor, query)
+    if seconds >= app.config['INSTRUMENTATION_SLOW_QUERY_SECONDS']:
+        metrics.add_slow_query()
+        if app.config['INSTRUMENTATION_EXPLAIN_SLOW_QUERIES'] and statement.lstrip().upper().startswith("SELECT"):
+            query["plan"] = explain(cursor.connection, statement, parameters)
+            logger.warning(json.dumps({"slow_query": statement, "seconds": seconds, "plan": query["plan"]}))
+    for trace in traces:
+        trace.queries.append(query)
+
+
+class RowCountingCursor:
+    """Proxy for a DB-API cursor which adds the number of rows fetched through it to a query record, as SQLite does not
+    report a row count for selects"""
+
+    def __init__(self, cursor, query):
+        self._cursor = cursor
+        self._query = query
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._query["rows"] += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._query["rows"] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._query["rows"] += len(rows)
+        return rows
+
+
+def explain(dbapi_connection, statement, parameters):
+    """list: returns the SQLite query plan of the statement, one line per step, run on a separate cursor so that the
+    statement's own results are not disturbed"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
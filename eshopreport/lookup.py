@@ -0,0 +1,152 @@
+"""
+lookup.py: Module containing an in-process index of the vendor commission rates and product promotions, partitioned
+by date, so that the rate or promotion in force for a (vendor, date) or (product, date) is found with two dictionary
+lookups instead of a join. The index is loaded on first use, refreshed for the dates touched by each import run in this
+process, and reloaded once its time to live has passed so that imports run in another process are picked up.
+"""
+
+from eshopreport import app, db
+from eshopreport.instrumentation import traced_statistic
+from eshopreport.models import Order, OrderLine, Promotion, ProductPromotion, VendorCommissions, IN_CLAUSE_BATCH_SIZE
+from sqlalchemy import func, true
+import threading
+import time
+
+
+class LookupIndex:
+    """Class to represent the commission rates and product promotions of each date, held in memory.
+
+          Attributes:
+              commission_rates (dict): date -> {vendor_id: rate}, holding the highest rate of a vendor with several
+              product_promotions (dict): date -> {product_id: promotion_id}
+              promotion_descriptions (dict): promotion_id -> description
+              ttl (float): number of seconds the index is used before it is reloaded. This bounds how long it can be
+                  stale after an import run in another process, which cannot refresh it.
+              database (str): url of the database the index was loaded from, or None if it has not been loaded
+        """
+
+    def __init__(self, ttl=60, clock=time.monotonic):
+        self.commission_rates = {}
+        self.product_promotions = {}
+        self.promotion_descriptions = {}
+        self.ttl = ttl
+        self.database = None
+        self._clock = clock
+        self._expiry = None
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f"LookupIndex({len(self.commission_rates)} commission dates, " \
+               f"{len(self.product_promotions)} promotion dates)"
+
+    def load(self):
+        """None: Loads every date's commission rates and product promotions from the app's current database"""
+        with self._lock:
+            self.commission_rates = {}
+            self.product_promotions = {}
+            self._load_partitions(true(), true())
+            self.promotion_descriptions = dict(db.session.query(Promotion.id_, Promotion.description))
+            self.database = str(db.engine.url)
+            self._expiry = self._clock() + self.ttl
+
+    def refresh(self, dates):
+        """None: Reloads the partitions of the given dates, e.g. after an import has changed their commissions or
+        promotions, leaving the other dates untouched. An index that has not been loaded is left to load on first use.
+        """
+        with self._lock:
+            if self.database != str(db.engine.url):
+                self.invalidate()
+                return
+            dates = sorted(set(dates))
+            for date in dates:
+                self.commission_rates.pop(date, None)
+                self.product_promotions.pop(date, None)
+            for i in range(0, len(dates), IN_CLAUSE_BATCH_SIZE):
+                batch = dates[i:i + IN_CLAUSE_BATCH_SIZE]
+                self._load_partitions(VendorCommissions.date.in_(batch), ProductPromotion.date.in_(batch))
+            self.promotion_descriptions = dict(db.session.query(Promotion.id_, Promotion.description))
+
+    def invalidate(self):
+        """None: Empties the index, so that it is loaded again on first use"""
+        with self._lock:
+            self.commission_rates = {}
+            self.product_promotions = {}
+            self.promotion_descriptions = {}
+            self.database = None
+            self._expiry = None
+
+    def _load_partitions(self, commission_filter, promotion_filter):
+        # A vendor may have several rates for a date, of which the highest is used
+        query = db.session.query(VendorCommissions.date, VendorCommissions.vendor_id, func.max(VendorCommissions.rate)
+                                 ).group_by(VendorCommissions.date, VendorCommissions.vendor_id)
+        for date, vendor_id, rate in query.filter(commission_filter):
+            self.commission_rates.setdefault(date, {})[vendor_id] = rate
+        query = db.session.query(ProductPromotion.date, ProductPromotion.product_id, ProductPromotion.promotion_id)
+        for date, product_id, promotion_id in query.filter(promotion_filter):
+            self.product_promotions.setdefault(date, {})[product_id] = promotion_id
+
+    def _ensure_loaded(self):
+        # The app's database can be switched, e.g. by the tests, so the index is also reloaded when it has changed
+        with self._lock:
+            if self.database != str(db.engine.url) or self._clock() >= self._expiry:
+                self.load()
+
+    def get_commission_rates(self, date):
+        """dict: returns {vendor_id: rate} of the commissions in force on the input date"""
+        self._ensure_loaded()
+        return self.commission_rates.get(date, {})
+
+    def get_commission_rate(self, vendor_id, date):
+        """float: returns the vendor's commission rate on the input date, or None if it has none"""
+        return self.get_commission_rates(date).get(vendor_id)
+
+    def get_product_promotions(self, date):
+        """dict: returns {product_id: promotion_id} of the products promoted on the input date"""
+        self._ensure_loaded()
+        return self.product_promotions.get(date, {})
+
+    def get_promotion(self, product_id, date):
+        """int: returns the id of the promotion of the product on the input date, or None if it was not promoted"""
+        return self.get_product_promotions(date).get(product_id)
+
+    @traced_statistic
+    def get_promotion_breakdown(self, date):
+        """list: returns a dict for each promotion running on the input date, ordered by promotion id, holding the
+        number of order lines, items, total discount and total amount of that date's order lines whose product it
+        promoted. A final dict with promotion_id None holds the same for the lines whose product was not promoted. The
+        lines are summed per product in SQL and each product's promotion is then found in the index. Raises IndexError
+        if no order lines exist for the date."""
+        promotions = self.get_product_promotions(date)
+        products = db.session.query(
+            OrderLine.product_id,
+            func.count(OrderLine.id_),
+            func.sum(OrderLine.quantity),
+            func.sum(OrderLine.full_price_amount - OrderLine.discounted_amount),
+            func.sum(OrderLine.total_amount)
+            ).join(Order, OrderLine.order_id == Order.id_
+            ).filter(Order.created_at == date
+            ).group_by(OrderLine.product_id).all()
+        if not products:
+            raise IndexError(f"No order lines for {date}")
+
+        breakdown = {promotion_id: self._breakdown_row(promotion_id)
+                     for promotion_id in sorted(set(promotions.values()))}
+        breakdown[None] = self._breakdown_row(None)
+        for product_id, line_count, quantity, discount, total_amount in products:
+            row = breakdown[promotions.get(product_id)]
+            row["order_lines"] += line_count
+            row["total_items"] += quantity
+            row["total_discount"] += discount
+            row["total_amount"] += total_amount
+        return list(breakdown.values())
+
+    def _breakdown_row(self, promotion_id):
+        return {"promotion_id": promotion_id,
+                "description": self.promotion_descriptions.get(promotion_id),
+                "order_lines": 0,
+                "total_items": 0,
+                "total_discount": 0.0,
+                "total_amount": 0.0}
+
+
+lookup_index = LookupIndex(app.config['LOOKUP_INDEX_TTL'])
@@ -0,0 +1,134 @@
+"""
+migrate.py: Module to bring an existing database (eshopreport/eshop.db) up to date with the tables, foreign keys and
+indexes declared in models.py, and to compare the query plan and timing of each report statistic before and after.
+"""
+
+from datetime import datetime
+from eshopreport.models import DailyReport, OrderTotals, ReportForDate
+from eshopreport import db, generate_data
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import OperationalError
+import argparse
+import statistics
+import time
+
+# Methods of ReportForDate timed and explained by explain_report_queries
+REPORT_METHODS = ['get_total_items', 'get_total_customers', 'get_total_discount', 'get_avg_discount_rate',
+                  'get_avg_order_total', 'get_total_commissions', 'get_avg_commissions_per_order',
+                  'get_report_statistics']
+
+
+def main(date, repeat=20):
+    print("Before migration:")
+    print_report_queries(explain_report_queries(date, repeat))
+    upgrade()
+    print("\nAfter migration:")
+    print_report_queries(explain_report_queries(date, repeat))
+
+
+def upgrade():
+    """None: Creates any missing tables, rebuilds any table whose foreign keys differ from its model and creates any
+    missing indexes, then gathers the statistics SQLite's query planner uses to choose between them. If either of the
+    precomputed order_totals and daily_report tables was missing, both are populated from the orders. The database is
+    switched to write-ahead logging for the read-only report connections."""
+    missing_tables = set(db.metadata.tables) - set(inspect(db.engine).get_table_names())
+    db.create_all()
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if get_foreign_keys(inspector, table.name) != {(tuple(fk.parent.name for fk in constraint.elements),
+                                                        constraint.referred_table.name,
+                                                        tuple(fk.column.name for fk in constraint.elements))
+                                                       for constraint in table.foreign_key_constraints}:
+            rebuild_table(table)
+
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+    if missing_tables & {OrderTotals.__tablename__, DailyReport.__tablename__}:
+        generate_data.refresh_daily_report()
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('ANALYZE')
+    generate_data.enable_wal_mode()
+
+
+def get_foreign_keys(inspector, table_name):
+    """set: Returns a (columns, referred table, referred columns) tuple for each foreign key of the table in the
+    database"""
+    return {(tuple(fk['constrained_columns']), fk['referred_table'], tuple(fk['referred_columns']))
+            for fk in inspector.get_foreign_keys(table_name)}
+
+
+def rebuild_table(table):
+    """None: Recreates the table from its model and copies its rows across. SQLite cannot alter a table's foreign
+    keys, so the table is rebuilt following https://www.sqlite.org/lang_altertable.html#otheralter. Its indexes are
+    dropped along with the old table and are recreated by upgrade."""
+    new_table = table.to_metadata(db.metadata, name=f'{table.name}_new')
+    new_table.indexes.clear()
+    columns = ', '.join(column.name for column in table.columns)
+    try:
+        with db.engine.begin() as connection:
+            new_table.create(connection)
+            connection.exec_driver_sql(f'INSERT INTO {new_table.name} ({columns}) SELECT {columns} FROM {table.name}')
+            connection.exec_driver_sql(f'DROP TABLE {table.name}')
+            connection.exec_driver_sql(f'ALTER TABLE {new_table.name} RENAME TO {table.name}')
+    finally:
+        db.metadata.remove(new_table)
+
+
+def explain_report_queries(date, repeat=20):
+    """list: Returns a (method name, median milliseconds, query plans) tuple for each of the REPORT_METHODS called with
+    the date, where query plans holds the EXPLAIN QUERY PLAN rows of each SQL statement the method runs. Methods which
+    read a table the database does not have yet are returned with None milliseconds and no plans."""
+    results = []
+    for name in REPORT_METHODS:
+        method = getattr(ReportForDate, name)
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            method(date)
+        except OperationalError:
+            db.session.rollback()
+            results.append((name, None, []))
+            continue
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+
+        timings = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            method(date)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        plans = [db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+                 for statement, parameters in statements]
+        results.append((name, statistics.median(timings), plans))
+    db.session.rollback()
+    return results
+
+
+def print_report_queries(results):
+    """None: Prints the timings and query plans returned by explain_report_queries, indenting each plan step under its
+    parent"""
+    for name, milliseconds, plans in results:
+        if milliseconds is None:
+            print(f"{name}: requires a table created by the migration")
+            continue
+        print(f"{name}: {milliseconds:.3f} ms")
+        for plan in plans:
+            depths = {0: 0}
+            for id_, parent, _, detail in plan:
+                depths[id_] = depths.get(parent, 0) + 1
+                print("  " * depths[id_] + detail)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the database to the schema in models.py, printing the query "
+                                                 "plan and timing of each report statistic before and after")
+    parser.add_argument("--date", default="2019-08-02", help="date of the report to explain (YYYY-MM-DD)")
+    parser.add_argument("--repeat", type=int, default=20, help="number of times each statistic is timed")
+    args = parser.parse_args()
+    main(datetime.strptime(args.date, "%Y-%m-%d").date(), args.repeat)
@@ -6,12 +6,19 @@ for this project.
 
 from datetime import datetime
 from eshopreport import db
-from sqlalchemy import func
+from eshopreport.instrumentation import traced_statistic
+from sqlalchemy import bindparam, func, distinct
 import statistics
 
+# Maximum number of values in the IN clause of a statement run for many dates or ids, keeping it within SQLite's
+# variable limit
+IN_CLAUSE_BATCH_SIZE = 500
+
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    # Reports filter orders by date and group by order, so the index is ordered by id within each date
+    __table_args__ = (db.Index('ix_orders_created_at_id', 'created_at', 'id_', 'vendor_id', 'customer_id'),)
 
     id_ = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.Date, nullable=False, default=datetime.utcnow().date())
@@ -31,9 +38,16 @@ class Order(db.Model):
 
 class OrderLine(db.Model):
     __tablename__ = 'order_line'
+    __table_args__ = (
+        # Natural key of an order line, used to upsert changed lines when appending new data
+        db.Index('ix_order_line_order_id_product_id', 'order_id', 'product_id', unique=True),
+        # Covers every column aggregated by the reports, so that an order's lines are summed from the index alone
+        db.Index('ix_order_line_order_id_amounts', 'order_id', 'quantity', 'discount_rate', 'full_price_amount',
+                 'discounted_amount', 'total_amount'),
+    )
 
     id_ = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id_'), db.ForeignKey('product_promotion.product_id'))
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id_'))
     product_id = db.Column(db.Integer, db.ForeignKey('products.id_'), nullable=False)
     product_description = db.Column(db.String(200), nullable=False)
     product_price = db.Column(db.Float, nullable=False)
@@ -103,7 +117,6 @@ class ProductPromotion(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('products.id_'))
     date = db.Column(db.DATE, nullable=False)
     promotion_id = db.Column(db.Integer, db.ForeignKey('promotion.id_'), nullable=False)
-    order_lines = db.relationship('OrderLine', backref='orderline', lazy=True)
 
     def __init__(self, product_id, date, promotion_id):
         self.product_id = product_id
@@ -116,6 +129,8 @@ class ProductPromotion(db.Model):
 
 class VendorCommissions(db.Model):
     __tablename__ = 'vendor_commissions'
+    # Looks up a vendor's commission rate for a date from the index alone
+    __table_args__ = (db.Index('ix_vendor_commissions_vendor_id_date', 'vendor_id', 'date', 'rate'),)
 
     vendor_commissions_id = db.Column(db.Integer, primary_key=True)
     vendor_id = db.Column(db.Integer)
@@ -132,6 +147,167 @@ class VendorCommissions(db.Model):
         return f"VendorCommissions({self.vendor_id}, {self.date}, {self.rate})"
 
 
+class ImportCheckpoint(db.Model):
+    """Number of rows of a csv file that have been imported, recorded in the same transaction as each imported chunk so
+    that an interrupted import can be resumed from the last committed row."""
+    __tablename__ = 'import_checkpoint'
+
+    source = db.Column(db.String(500), primary_key=True)
+    rows_imported = db.Column(db.Integer, nullable=False)
+
+    def __init__(self, source, rows_imported):
+        self.source = source
+        self.rows_imported = rows_imported
+
+    def __repr__(self):
+        return f"ImportCheckpoint('{self.source}', {self.rows_imported})"
+
+    @staticmethod
+    def get_rows_imported(source):
+        """int: returns the number of rows of the source file imported so far, or 0 if it has not been imported."""
+        checkpoint = ImportCheckpoint.query.get(source)
+        return checkpoint.rows_imported if checkpoint else 0
+
+
+class OrderTotals(db.Model):
+    """Precomputed totals of each order's lines and its vendor's commission rate on the order date, so that the
+    combined report queries of ReportForDate read one row per order instead of grouping the order lines. Orders
+    without lines have no row."""
+    __tablename__ = 'order_totals'
+
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id_'), primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False)
+    full_price_amount = db.Column(db.Float, nullable=False)
+    discounted_amount = db.Column(db.Float, nullable=False)
+    total_amount = db.Column(db.Float, nullable=False)
+    discount_rate_sum = db.Column(db.Float, nullable=False)
+    line_count = db.Column(db.Integer, nullable=False)
+    commission_rate = db.Column(db.Float)
+
+    def __init__(self, order_id, quantity, full_price_amount, discounted_amount, total_amount, discount_rate_sum,
+                 line_count, commission_rate):
+        self.order_id = order_id
+        self.quantity = quantity
+        self.full_price_amount = full_price_amount
+        self.discounted_amount = discounted_amount
+        self.total_amount = total_amount
+        self.discount_rate_sum = discount_rate_sum
+        self.line_count = line_count
+        self.commission_rate = commission_rate
+
+    def __repr__(self):
+        return f"OrderTotals({self.order_id}, {self.quantity}, {self.full_price_amount}, {self.discounted_amount}, " \
+               f"{self.total_amount}, {self.discount_rate_sum}, {self.line_count}, {self.commission_rate})"
+
+    @classmethod
+    def refresh(cls, dates, commission_rates):
+        """None: Recomputes the rows for the orders created on the given dates from their order lines. Each vendor's
+        commission rate on a date is taken from commission_rates, any object with a get_commission_rates(date) method
+        such as lookup.LookupIndex, which must already hold the dates' current rates. Rows for orders which have moved
+        to another of the dates are replaced. The caller is responsible for committing the session."""
+        dates = sorted(set(dates))
+        columns = [column.name for column in cls.__table__.columns if column.name != 'commission_rate']
+        for i in range(0, len(dates), IN_CLAUSE_BATCH_SIZE):
+            batch = dates[i:i + IN_CLAUSE_BATCH_SIZE]
+            orders = db.session.query(Order.id_).filter(Order.created_at.in_(batch))
+            db.session.execute(cls.__table__.delete().where(cls.order_id.in_(orders.statement)))
+            totals = db.session.query(
+                OrderLine.order_id,
+                func.sum(OrderLine.quantity),
+                func.sum(OrderLine.full_price_amount),
+                func.sum(OrderLine.discounted_amount),
+                func.sum(OrderLine.total_amount),
+                func.sum(OrderLine.discount_rate),
+                func.count(OrderLine.id_)
+                ).select_from(Order
+                ).join(OrderLine, OrderLine.order_id == Order.id_
+                ).filter(Order.created_at.in_(batch)
+                ).group_by(OrderLine.order_id)
+            db.session.execute(cls.__table__.insert().from_select(columns, totals.statement))
+
+            # The lines are summed without joining the commissions, so each rate is then set on its vendor's orders
+            rates = [{'date': date, 'vendor_id': vendor_id, 'rate': rate}
+                     for date in batch for vendor_id, rate in commission_rates.get_commission_rates(date).items()]
+            if rates:
+                vendor_orders = db.session.query(Order.id_).filter(Order.created_at == bindparam('date'),
+                                                                   Order.vendor_id == bindparam('vendor_id'))
+                db.session.execute(cls.__table__.update().where(cls.order_id.in_(vendor_orders.statement)
+                                                                ).values(commission_rate=bindparam('rate')), rates)
+
+
+class DailyReport(db.Model):
+    """Precomputed summary of the orders for each date. Each row holds the sums and counts from which every
+    ReportForDate statistic is rebuilt, so a report can be served from one row instead of aggregating order lines."""
+    __tablename__ = 'daily_report'
+
+    date = db.Column(db.Date, primary_key=True)
+    total_items = db.Column(db.Integer)
+    total_customers = db.Column(db.Integer, nullable=False)
+    total_discount = db.Column(db.Float)
+    discount_rate_sum = db.Column(db.Float)
+    line_count = db.Column(db.Integer, nullable=False)
+    order_count = db.Column(db.Integer, nullable=False)
+    order_total_sum = db.Column(db.Float)
+    commission_order_count = db.Column(db.Integer, nullable=False)
+    commission_total = db.Column(db.Float)
+
+    def __init__(self, date, total_items, total_customers, total_discount, discount_rate_sum, line_count, order_count,
+                 order_total_sum, commission_order_count, commission_total):
+        self.date = date
+        self.total_items = total_items
+        self.total_customers = total_customers
+        self.total_discount = total_discount
+        self.discount_rate_sum = discount_rate_sum
+        self.line_count = line_count
+        self.order_count = order_count
+        self.order_total_sum = order_total_sum
+        self.commission_order_count = commission_order_count
+        self.commission_total = commission_total
+
+    def __repr__(self):
+        return f"DailyReport({self.date}, {self.total_items}, {self.total_customers}, {self.total_discount}, " \
+               f"{self.discount_rate_sum}, {self.line_count}, {self.order_count}, {self.order_total_sum}, " \
+               f"{self.commission_order_count}, {self.commission_total})"
+
+    @classmethod
+    def refresh(cls, dates):
+        """None: Recomputes the rows for the given dates from their orders and OrderTotals, which must be refreshed
+        first. Dates with no orders are removed. The caller is responsible for committing the session."""
+        dates = sorted(set(dates))
+        columns = [column.name for column in cls.__table__.columns]
+        for i in range(0, len(dates), IN_CLAUSE_BATCH_SIZE):
+            batch = dates[i:i + IN_CLAUSE_BATCH_SIZE]
+            db.session.execute(cls.__table__.delete().where(cls.date.in_(batch)))
+            components = ReportForDate._aggregate_components(Order.created_at.in_(batch))
+            db.session.execute(cls.__table__.insert().from_select(columns, components.statement))
+
+    @staticmethod
+    @traced_statistic
+    def get_report_statistics(date):
+        """dict: returns every report statistic for the input date from its precomputed row. If the date has not been
+        summarised yet, they are calculated by ReportForDate.get_report_statistics instead, from the order_totals rows
+        of that day's orders. Raises IndexError if no order lines exist for the date."""
+        row = DailyReport.query.get(date)
+        if row is None:
+            return ReportForDate.get_report_statistics(date)
+        if not row.line_count:
+            raise IndexError(f"No order lines for {date}")
+        return ReportForDate._statistics_from_components(row)
+
+
+class ReportStatistic:
+    """Descriptor for a statistic of a ReportForDate. The statistic is calculated on first access, along with the
+    others from the same query, and is then remembered by the report."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, report, owner=None):
+        if report is None:
+            return self
+        return report.get_results([self.name])[self.name]
+
+
 class ReportForDate:
     """Class to represent an eshop report which analyses the orders for a given date.
 
@@ -143,20 +319,39 @@ class ReportForDate:
               avg_order_total: average order total for the input date
               total_commissions: total commissions for the input date
               avg_commissions_per_order: average commissions per order for the input date
+
+          The statistics are only calculated when they are first used, and are then remembered. They are read from
+          source, any object with a get_report_statistics(date) method such as DailyReport. By default they are
+          aggregated from the precomputed OrderTotals, one row per order, by a single query for whichever statistics
+          are needed (see get_statistics). Using a statistic raises IndexError if no order lines exist for the date.
         """
 
-    def __init__(self, date: datetime):
+    # Names of the report statistics, in the order they are reported
+    fields = ["total_items", "total_customers", "total_discount", "avg_discount_rate", "avg_order_total",
+              "total_commissions", "avg_commissions_per_order"]
+
+    # Statistics calculated by the same query, so that they are fetched together when any one of them is needed
+    query_groups = {"items": ["total_items", "total_discount", "avg_discount_rate"],
+                    "customers": ["total_customers"],
+                    "orders": ["avg_order_total"],
+                    "commissions": ["total_commissions", "avg_commissions_per_order"]}
+
+    total_items = ReportStatistic()
+    total_customers = ReportStatistic()
+    total_discount = ReportStatistic()
+    avg_discount_rate = ReportStatistic()
+    avg_order_total = ReportStatistic()
+    total_commissions = ReportStatistic()
+    avg_commissions_per_order = ReportStatistic()
+
+    def __init__(self, date: datetime, source=None):
         self.date = date
-
-        self.total_items = self.get_total_items(self.date)
-        self.total_customers = self.get_total_customers(self.date)
-        self.total_discount = self.get_total_discount(self.date)
-        self.avg_discount_rate = self.get_avg_discount_rate(self.date)
-        self.avg_order_total = self.get_avg_order_total(self.date)
-        self.total_commissions = self.get_total_commissions(self.date)
-        self.avg_commissions_per_order = self.get_avg_commissions_per_order(self.date)
+        self.source = source
+        self._results = {}
 
     def __str__(self):
+        # Every statistic is shown, so fetch them together rather than one query group at a time
+        self.get_results()
         return f'eShop Report for {self.date}\n' \
                f'Total Number of Items Sold: {self.total_items:,}\n' \
                f'Total Number of Customers: {self.total_customers}\n' \
@@ -168,18 +363,173 @@ class ReportForDate:
 
     def get_all_results(self):
         "dict: returns a dictionary containing all report statistics."
-        results_dict = {"date": self.date,
-                        "total_items": self.total_items,
-                        "total_customers": self.total_customers,
-                        "total_discount": self.total_discount,
-                        "avg_discount_rate": self.avg_discount_rate,
-                        "avg_order_total": self.avg_order_total,
-                        "total_commissions": self.total_commissions,
-                        "avg_commissions_per_order": self.avg_commissions_per_order
-                        }
-        return results_dict
+        return {"date": self.date, **self.get_results()}
+
+    def get_results(self, fields=None):
+        """dict: returns the requested statistics (all of them by default), calculating any which have not been used
+        yet. Raises ValueError for an unknown statistic."""
+        fields = self.fields if fields is None else list(fields)
+        unknown = set(fields) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Statistics must be among {', '.join(self.fields)}, not {', '.join(sorted(unknown))}")
+        missing = [field for field in fields if field not in self._results]
+        if missing:
+            if self.source is None:
+                self._results.update(ReportForDate.get_statistics(self.date, missing))
+            else:
+                self._results.update(self.source.get_report_statistics(self.date))
+        return {field: self._results[field] for field in fields}
 
     @staticmethod
+    def get_query_group(fields):
+        """str: returns the name of the query group which holds all of the statistics in fields, or None if they span
+        more than one"""
+        groups = {group for group, group_fields in ReportForDate.query_groups.items() if set(fields) & set(group_fields)}
+        return groups.pop() if len(groups) == 1 else None
+
+    @staticmethod
+    @traced_statistic
+    def get_statistics(date, fields):
+        """dict: returns at least the statistics in fields for the input date, from a single query. The query of their
+        group is used if they share one, otherwise every statistic is calculated by get_report_statistics. Raises
+        IndexError if no order lines exist for the date."""
+        group = ReportForDate.get_query_group(fields)
+        if group is None:
+            return ReportForDate.get_report_statistics(date)
+        row = ReportForDate._group_components(group, Order.created_at == date).one()
+        return ReportForDate._statistics_from_group(group, row)
+
+    @staticmethod
+    @traced_statistic
+    def get_report_statistics(date):
+        """dict: returns every report statistic for the input date, calculated from a single scan of the order_totals
+        rows of that day's orders. Raises IndexError if no order lines exist for the date, in line with the
+        get_statistic methods."""
+        result = ReportForDate._aggregate_components(Order.created_at == date).all()
+        if not result or not result[0].line_count:
+            raise IndexError(f"No order lines for {date}")
+        return ReportForDate._statistics_from_components(result[0])
+
+    @staticmethod
+    @traced_statistic
+    def for_dates(dates):
+        """list: returns a dictionary of report statistics for each of the input dates, in date order, aggregated by one
+        grouped query per IN_CLAUSE_BATCH_SIZE dates rather than one query per date. Dates with no order lines are included
+        with each statistic set to None."""
+        dates = sorted(set(dates))
+        results = dict.fromkeys(dates)
+        for i in range(0, len(dates), IN_CLAUSE_BATCH_SIZE):
+            batch = dates[i:i + IN_CLAUSE_BATCH_SIZE]
+            for row in ReportForDate._aggregate_components(Order.created_at.in_(batch)).all():
+                if row.line_count:
+                    results[row.bucket] = ReportForDate._statistics_from_components(row)
+        return [{"date": date, **(statistics or dict.fromkeys(ReportForDate.fields))}
+                for date, statistics in results.items()]
+
+    @staticmethod
+    def _group_components(group, *criteria):
+        """Query: the sums and counts from which the statistics of the query group are derived, over the orders matching
+        the criteria. row_count is the number of order lines, or of orders for the customers group. Every group but
+        the customers reads the precomputed OrderTotals, one row per order."""
+        if group == "customers":
+            return db.session.query(
+                func.count(distinct(Order.customer_id)).label('total_customers'),
+                func.count(Order.id_).label('row_count')
+                ).filter(*criteria)
+        orders = db.session.query(func.sum(OrderTotals.line_count).label('row_count')
+            ).select_from(Order
+            ).join(OrderTotals, OrderTotals.order_id == Order.id_
+            ).filter(*criteria)
+        if group == "items":
+            return orders.add_columns(
+                func.sum(OrderTotals.quantity).label('total_items'),
+                func.sum(OrderTotals.full_price_amount - OrderTotals.discounted_amount).label('total_discount'),
+                (func.sum(OrderTotals.discount_rate_sum) / func.sum(OrderTotals.line_count)).label('avg_discount_rate'))
+        if group == "orders":
+            return orders.add_columns(
+                func.sum(OrderTotals.total_amount).label('order_total_sum'),
+                func.count(OrderTotals.order_id).label('order_count'))
+        return orders.add_columns(
+            func.sum(OrderTotals.commission_rate * OrderTotals.total_amount).label('commission_total'),
+            func.count(OrderTotals.commission_rate).label('commission_order_count'))
+
+    @staticmethod
+    def _statistics_from_group(group, components):
+        """dict: derives the statistics of the query group from a row of sums and counts (see _group_components)."""
+        if not components.row_count:
+            raise IndexError("No order lines for the report")
+        if group == "items":
+            return {"total_items": components.total_items,
+                    "total_discount": components.total_discount,
+                    "avg_discount_rate": components.avg_discount_rate}
+        if group == "customers":
+            return {"total_customers": components.total_customers}
+        if group == "orders":
+            return {"avg_order_total": components.order_total_sum / components.order_count}
+        commission_total = components.commission_total or 0
+        if components.commission_order_count:
+            avg_commissions_per_order = commission_total / components.commission_order_count
+        else:
+            avg_commissions_per_order = 0
+        return {"total_commissions": commission_total, "avg_commissions_per_order": avg_commissions_per_order}
+
+    @staticmethod
+    def _order_totals(bucket, *criteria):
+        """Subquery: one row per order matching the criteria, holding the sums of its order lines and commission from
+        OrderTotals. Orders are outer joined so that customers are counted even if their order has no lines, as in
+        get_total_customers."""
+        return db.session.query(
+            bucket.label('bucket'),
+            Order.id_.label('order_id'),
+            Order.customer_id,
+            OrderTotals.quantity,
+            (OrderTotals.full_price_amount - OrderTotals.discounted_amount).label('discount'),
+            OrderTotals.discount_rate_sum,
+            OrderTotals.line_count,
+            OrderTotals.total_amount.label('order_total'),
+            (OrderTotals.commission_rate * OrderTotals.total_amount).label('commission')
+            ).select_from(Order
+            ).outerjoin(OrderTotals, OrderTotals.order_id == Order.id_
+            ).filter(*criteria
+            ).subquery()
+
+    @staticmethod
+    def _aggregate_components(*criteria, bucket=Order.created_at):
+        """Query: the sums and counts from which every report statistic is derived, one row per bucket in order."""
+        orders = ReportForDate._order_totals(bucket, *criteria)
+        return db.session.query(
+            orders.c.bucket,
+            func.sum(orders.c.quantity).label('total_items'),
+            func.count(distinct(orders.c.customer_id)).label('total_customers'),
+            func.sum(orders.c.discount).label('total_discount'),
+            func.sum(orders.c.discount_rate_sum).label('discount_rate_sum'),
+            func.sum(orders.c.line_count).label('line_count'),
+            func.count(orders.c.order_total).label('order_count'),
+            func.sum(orders.c.order_total).label('order_total_sum'),
+            func.count(orders.c.commission).label('commission_order_count'),
+            func.sum(orders.c.commission).label('commission_total')
+            ).group_by(orders.c.bucket
+            ).order_by(orders.c.bucket)
+
+    @staticmethod
+    def _statistics_from_components(components):
+        """dict: derives the report statistics from a row of sums and counts (see _aggregate_components)."""
+        commission_total = components.commission_total or 0
+        if components.commission_order_count:
+            avg_commissions_per_order = commission_total / components.commission_order_count
+        else:
+            avg_commissions_per_order = 0
+        return {"total_items": components.total_items,
+                "total_customers": components.total_customers,
+                "total_discount": components.total_discount,
+                "avg_discount_rate": components.discount_rate_sum / components.line_count,
+                "avg_order_total": components.order_total_sum / components.order_count,
+                "total_commissions": commission_total,
+                "avg_commissions_per_order": avg_commissions_per_order
+                }
+
+    @staticmethod
+    @traced_statistic
     def get_total_items(date):
         result = db.session.query(
             Order.created_at,
@@ -190,6 +540,7 @@ class ReportForDate:
         return result
 
     @staticmethod
+    @traced_statistic
     def get_total_customers(date):
         result = db.session.query(Order.customer_id
                                 ).filter(Order.created_at == date
@@ -197,6 +548,7 @@ class ReportForDate:
         return len(result)
 
     @staticmethod
+    @traced_statistic
     def get_total_discount(date):
         result = db.session.query(
             Order.created_at,
@@ -207,6 +559,7 @@ class ReportForDate:
         return result
 
     @staticmethod
+    @traced_statistic
     def get_avg_discount_rate(date):
         result = db.session.query(
             Order.created_at,
@@ -218,6 +571,7 @@ class ReportForDate:
         return result
 
     @staticmethod
+    @traced_statistic
     def get_avg_order_total(date):
         result = db.session.query(
             Order.created_at,
@@ -232,6 +586,7 @@ class ReportForDate:
         return order_avg
 
     @staticmethod
+    @traced_statistic
     def get_total_commissions(date):
         result = db.session.query(
                 Order.id_,
@@ -250,6 +605,7 @@ class ReportForDate:
         return com_tot
 
     @staticmethod
+    @traced_statistic
     def get_avg_commissions_per_order(date):
         result = db.session.query(
                 Order.id_,
@@ -263,4 +619,47 @@ class ReportForDate:
             ).group_by(Order.id_).all()
 
         order_avg = statistics.mean([element[-1] for element in result])
-        return order_avg
\ No newline at end of file
+        return order_avg
+
+
+
+class ReportForRange:
+    """Class to represent an eshop report which analyses the orders between two dates, split into buckets of a day, a
+    week (starting on Monday) or a month. All buckets are calculated together by a single grouped query, so the cost
+    does not grow with the number of buckets.
+
+          Attributes:
+              start (datetime): first date of the requested range (inclusive)
+              end (datetime): last date of the requested range (inclusive)
+              granularity (str): size of each bucket, one of "day", "week" or "month"
+              results (list): dictionary of report statistics for each bucket containing order lines, in date order.
+                  The "date" of each bucket is its first day; buckets at either end only include orders in the range.
+        """
+
+    # SQL expressions giving the first day of the bucket containing an order
+    buckets = {"day": Order.created_at,
+               "week": func.date(Order.created_at, 'weekday 0', '-6 days', type_=db.Date),
+               "month": func.date(Order.created_at, 'start of month', type_=db.Date)}
+
+    def __init__(self, start: datetime, end: datetime, granularity="day"):
+        if granularity not in self.buckets:
+            raise ValueError(f"Granularity must be one of {', '.join(self.buckets)}, not {granularity!r}")
+        self.start = start
+        self.end = end
+        self.granularity = granularity
+        self.results = self.get_results(start, end, granularity)
+
+    def __str__(self):
+        return f'eShop Report from {self.start} to {self.end} by {self.granularity}\n' + \
+               '\n'.join(f'{result["date"]}: {result["total_items"]:,} items, '
+                         f'£{round(result["avg_order_total"], 2):,} average order total' for result in self.results)
+
+    @staticmethod
+    def get_results(start, end, granularity="day"):
+        """list: returns a dictionary of report statistics for each bucket between start and end which contains order
+        lines."""
+        bucket = ReportForRange.buckets[granularity]
+        rows = ReportForDate._aggregate_components(Order.created_at >= start, Order.created_at <= end, bucket=bucket
+                                                   ).all()
+        return [{"date": row.bucket, **ReportForDate._statistics_from_components(row)}
+                for row in rows if row.line_count]
@@ -2,9 +2,12 @@
 routes.py: routes for eshop report application
 """
 
-from flask import render_template, request
+from flask import render_template, request, jsonify, Response, stream_with_context
 from eshopreport import app
-from eshopreport import models
+from eshopreport import export, models
+from eshopreport.cache import report_cache
+from eshopreport.instrumentation import metrics
+from eshopreport.lookup import lookup_index
 from datetime import datetime
 
 
@@ -15,8 +18,9 @@ def home():
             # Convert the user input string to datetime date object
             date = datetime.strptime(request.form["dt"], "%Y-%m-%d").date()
             try:
-                # Create a report for this date and assign variables for the table in "results.html"
-                report_results = models.ReportForDate(date).get_all_results()
+                # Fetch the report for this date, created from its daily summary if it is not cached, and assign
+                # variables for the table in "results.html"
+                report_results = report_cache.get_all_results(date)
                 return render_template('results.html',
                                        date=date,
                                        total_items=report_results["total_items"],
@@ -36,3 +40,84 @@ def home():
             return render_template('home.html', msg=message)
     else:
         return render_template('home.html')
+
+
+@app.route("/report/range", methods=["GET"])
+def report_range():
+    """JSON report for every day, week or month between the start and end query parameters (YYYY-MM-DD)."""
+    try:
+        start = datetime.strptime(request.args.get("start", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get("end", ""), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify(error="Please provide start and end dates in the format YYYY-MM-DD"), 400
+    if end < start:
+        return jsonify(error="The end date must not be before the start date"), 400
+    try:
+        report = models.ReportForRange(start, end, request.args.get("granularity", "day"))
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    return jsonify(start=start.isoformat(),
+                   end=end.isoformat(),
+                   granularity=report.granularity,
+                   results=[dict(result, date=result["date"].isoformat()) for result in report.results])
+
+
+@app.route("/report/dates", methods=["GET"])
+def report_dates():
+    """JSON report for each date in the comma separated dates query parameter (YYYY-MM-DD), all calculated together.
+    Dates with no data are returned with each statistic set to null."""
+    try:
+        dates = [datetime.strptime(date, "%Y-%m-%d").date() for date in request.args.get("dates", "").split(",")]
+    except ValueError:
+        return jsonify(error="Please provide comma separated dates in the format YYYY-MM-DD"), 400
+    return jsonify(results=[dict(result, date=result["date"].isoformat())
+                            for result in models.ReportForDate.for_dates(dates)])
+
+
+@app.route("/report/promotions", methods=["GET"])
+def report_promotions():
+    """JSON breakdown of the order lines for the date query parameter (YYYY-MM-DD) by the promotion of their product."""
+    try:
+        date = datetime.strptime(request.args.get("date", ""), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify(error="Please provide a date in the format YYYY-MM-DD"), 400
+    try:
+        promotions = lookup_index.get_promotion_breakdown(date)
+    except IndexError:
+        return jsonify(error="No data for this date."), 404
+    return jsonify(date=date.isoformat(), promotions=promotions)
+
+
+@app.route("/export/orders", methods=["GET"])
+def export_orders():
+    """Streamed download of the order-level figures for every order created from the start to the end query parameter
+    (YYYY-MM-DD, inclusive; end defaults to start), as CSV or NDJSON according to the format query parameter."""
+    try:
+        start = datetime.strptime(request.args.get("start", ""), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get("end", start.isoformat()), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify(error="Please provide start and end dates in the format YYYY-MM-DD"), 400
+    if end < start:
+        return jsonify(error="The end date must not be before the start date"), 400
+    export_format = request.args.get("format", "csv")
+    if export_format not in export.FORMATS:
+        return jsonify(error=f"Format must be one of {', '.join(export.FORMATS)}"), 400
+
+    writer, mimetype, extension = export.FORMATS[export_format]
+    # The request context, and so the session, is kept open until the last row has been streamed
+    return Response(stream_with_context(writer(export.query_order_rows(start, end))),
+                    mimetype=mimetype,
+                    headers={"Content-Disposition": f'attachment; filename="orders_{start}_{end}.{extension}"'})
+
+
+@app.route("/report/cache", methods=["GET"])
+def report_cache_stats():
+    """JSON hit and miss counters for the report cache."""
+    return jsonify(report_cache.get_stats())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_text():
+    """Wall time, database round trips, rows and database time of each report statistic and route, in Prometheus text
+    format."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,169 @@
+"""
+snapshot.py: Module to export the six data tables of the database to a compact columnar snapshot of NumPy .npy files,
+and to import a snapshot back into the database. Each column is a separate file which can be memory-mapped, with the
+text columns dictionary-encoded, and the snapshot also holds a ColumnarStore which the report layer memory-maps at
+startup instead of reading the tables.
+
+A snapshot directory holds manifest.json, a directory per table with a file per column, and store/ with the arrays of
+a ColumnarStore:
+    <table>/<column>.npy             values (dates as datetime64[D])
+    <table>/<column>.codes.npy       int32 codes into the dictionary for text columns, -1 for null
+    <table>/<column>.dictionary.npy  distinct values of a text column
+    <table>/<column>.null.npy        mask of null values for integer columns which have any
+"""
+
+from eshopreport import db, generate_data
+from eshopreport.columnar import ColumnarStore, read_frame
+from eshopreport.lookup import lookup_index
+from eshopreport.models import Order, OrderLine, Product, Promotion, ProductPromotion, VendorCommissions
+from sqlalchemy import Date, Float, Integer, String
+import argparse
+import json
+import numpy as np
+import os
+import pandas as pd
+import shutil
+import time
+
+SNAPSHOT_VERSION = 1
+
+# Tables held in a snapshot, in the order they are imported
+SNAPSHOT_TABLES = [Order.__table__, OrderLine.__table__, Product.__table__, Promotion.__table__,
+                   ProductPromotion.__table__, VendorCommissions.__table__]
+
+
+class Snapshot:
+    """Class to represent a snapshot directory whose columns are memory-mapped when first used.
+
+          Attributes:
+              directory (str): path of the snapshot directory
+              manifest (dict): version, row count of each table and encoding of each column
+        """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json')) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        if self.manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Snapshot version {self.manifest.get('version')} is not supported, expected "
+                             f"{SNAPSHOT_VERSION}")
+
+    def __repr__(self):
+        return f"Snapshot('{self.directory}', " + \
+               ", ".join(f"{name}: {table['rows']} rows" for name, table in self.manifest["tables"].items()) + ")"
+
+    def load_array(self, table_name, file_name):
+        """ndarray: returns the array in the table's file, memory-mapped read-only"""
+        return np.load(os.path.join(self.directory, table_name, f'{file_name}.npy'), mmap_mode='r')
+
+    def get_column(self, table_name, column_name):
+        """ndarray: returns the column's values memory-mapped, or for a text column its (codes, dictionary) arrays"""
+        encoding = self.manifest["tables"][table_name]["columns"][column_name]
+        if encoding == "dictionary":
+            return self.load_array(table_name, f'{column_name}.codes'), self.load_array(table_name,
+                                                                                        f'{column_name}.dictionary')
+        return self.load_array(table_name, column_name)
+
+    def get_frame(self, table_name):
+        """DataFrame: returns a copy of the table with its text columns decoded and its nulls restored as None"""
+        columns = {}
+        for column_name, encoding in self.manifest["tables"][table_name]["columns"].items():
+            if encoding == "dictionary":
+                codes, dictionary = self.get_column(table_name, column_name)
+                values = np.asarray(dictionary, dtype=object)[codes]
+                values[np.asarray(codes) < 0] = None
+            else:
+                values = np.array(self.get_column(table_name, column_name))
+                if encoding == "nullable":
+                    values = values.astype(object)
+                    values[self.load_array(table_name, f'{column_name}.null')] = None
+            columns[column_name] = values
+        return pd.DataFrame(columns)
+
+    def get_store(self):
+        """ColumnarStore: returns the snapshot's report store with each array memory-mapped"""
+        return ColumnarStore.load(os.path.join(self.directory, 'store'))
+
+
+def export_snapshot(directory):
+    """Snapshot: Writes each of the SNAPSHOT_TABLES and a ColumnarStore built from them, with the commission rates of
+    the lookup index, to a new snapshot directory, replacing any snapshot already there. The snapshot is written to a
+    temporary directory and moved into place once complete, so a reader never sees a partial snapshot."""
+    temp_directory = directory.rstrip(os.sep) + '.tmp'
+    shutil.rmtree(temp_directory, ignore_errors=True)
+    os.makedirs(temp_directory)
+
+    manifest = {"version": SNAPSHOT_VERSION, "tables": {}}
+    frames = {}
+    for table in SNAPSHOT_TABLES:
+        frame = read_frame(db.session.query(*table.columns))
+        frames[table.name] = frame
+        os.makedirs(os.path.join(temp_directory, table.name))
+        manifest["tables"][table.name] = {
+            "rows": len(frame),
+            "columns": {column.name: write_column(os.path.join(temp_directory, table.name), column, frame[column.name])
+                        for column in table.columns}}
+
+    store = ColumnarStore.from_frames(frames[Order.__tablename__], frames[OrderLine.__tablename__], lookup_index)
+    store.save(os.path.join(temp_directory, 'store'))
+    with open(os.path.join(temp_directory, 'manifest.json'), 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.rename(temp_directory, directory)
+    return Snapshot(directory)
+
+
+def write_column(directory, column, values):
+    """str: Writes the column's values to .npy files in the table's directory, returning the encoding used: "values",
+    "nullable" for an integer column with nulls, or "dictionary" for a text column"""
+    path = os.path.join(directory, column.name)
+    if isinstance(column.type, String):
+        codes, dictionary = pd.factorize(values)
+        np.save(f'{path}.codes.npy', codes.astype(np.int32))
+        np.save(f'{path}.dictionary.npy', np.asarray(dictionary, dtype=str))
+        return "dictionary"
+    if isinstance(column.type, Date):
+        np.save(f'{path}.npy', pd.to_datetime(values).to_numpy().astype('datetime64[D]'))
+        return "values"
+    if isinstance(column.type, Float):
+        np.save(f'{path}.npy', values.to_numpy(np.float64, na_value=np.nan))
+        return "values"
+    if isinstance(column.type, Integer):
+        nulls = values.isna().to_numpy()
+        np.save(f'{path}.npy', values.fillna(0).to_numpy(np.int64))
+        if nulls.any():
+            np.save(f'{path}.null.npy', nulls)
+            return "nullable"
+        return "values"
+    raise TypeError(f"Column {column} of type {column.type} cannot be written to a snapshot")
+
+
+def import_snapshot(directory):
+    """None: Resets the database and imports each table of the snapshot into it with bulk inserts, then rebuilds the
+    precomputed order_totals and daily_report tables. No csv parsing or date conversion is needed, but the inserts
+    still dominate the time taken."""
+    snapshot = Snapshot(directory)
+    generate_data.reset_database()
+    rates = generate_data.ImportRates()
+    for table in SNAPSHOT_TABLES:
+        frame = snapshot.get_frame(table.name)
+        for column in table.columns:
+            if isinstance(column.type, Date):
+                frame[column.name] = generate_data.format_dates(pd.to_datetime(frame[column.name]))
+        generate_data.bulk_insert(table, frame, rates=rates)
+    rates.report()
+    generate_data.refresh_daily_report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the database to a columnar snapshot, or import one into it")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("directory", help="snapshot directory")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    if args.action == "export":
+        print(export_snapshot(args.directory))
+    else:
+        import_snapshot(args.directory)
+    print(f"{args.action.capitalize()}ed {args.directory} in {time.perf_counter() - start:.2f}s")
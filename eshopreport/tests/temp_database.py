@@ -0,0 +1,42 @@
+"""
+temp_database.py: base class for the unit tests which write to the database, running each test against a temporary
+copy of the data so that the bundled eshop.db is left untouched
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from eshopreport import app, db, generate_data
+from eshopreport.cache import report_cache
+
+
+class TemporaryDatabaseTestCase(unittest.TestCase):
+    """Switches the app to a new database in a temporary directory before each test, fills it with import_data, and
+    switches back afterwards. The directory also holds the database's write-ahead log, so it is removed as a whole.
+
+          Attributes:
+              database_path (str): path of the temporary database
+        """
+
+    def setUp(self):
+        self.database_uri = app.config['SQLALCHEMY_DATABASE_URI']
+        self.database_directory = tempfile.mkdtemp()
+        self.database_path = os.path.join(self.database_directory, 'eshop.db')
+        db.session.remove()
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + self.database_path
+        with redirect_stdout(StringIO()):
+            self.import_data()
+
+    def tearDown(self):
+        db.session.remove()
+        db.engine.dispose()
+        report_cache.invalidate()
+        app.config['SQLALCHEMY_DATABASE_URI'] = self.database_uri
+        shutil.rmtree(self.database_directory)
+
+    def import_data(self):
+        """None: Fills the temporary database, by default by importing the csv files in eshopreport/data"""
+        generate_data.main()
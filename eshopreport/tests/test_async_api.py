@@ -0,0 +1,99 @@
+"""
+test_async_api.py: unit testing for the /api/report endpoint and class ReadOnlyReports in module async_api
+"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from eshopreport import app, db
+from eshopreport.async_api import ReadOnlyReports, get_read_only_reports
+from eshopreport.models import ReportForDate
+from sqlalchemy.exc import OperationalError
+
+
+class TestAsyncApi(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_report(self):
+        """
+        Test: /api/report is requested with test date 2-Aug-2019.
+        Verification: The response should hold the same statistics as ReportForDate.
+        """
+        response = self.client.get("/api/report?date=2019-08-02")
+        self.assertEqual(response.status_code, 200)
+        expected = ReportForDate(self.test_date).get_all_results()
+        self.assertEqual(response.get_json()["date"], "2019-08-02")
+        self.assertEqual(response.get_json()["total_items"], expected["total_items"])
+        for key in ["total_discount", "avg_discount_rate", "avg_order_total", "total_commissions",
+                    "avg_commissions_per_order"]:
+            self.assertAlmostEqual(response.get_json()[key], expected[key])
+
+    def test_errors(self):
+        """
+        Test: /api/report is requested with an invalid date, and with a date which has no orders.
+        Verification: The responses should be 400 and 404 respectively.
+        """
+        self.assertEqual(self.client.get("/api/report?date=02-08-2019").status_code, 400)
+        self.assertEqual(self.client.get("/api/report?date=2000-01-01").status_code, 404)
+
+    def test_fields(self):
+        """
+        Test: /api/report is requested for test date 2-Aug-2019 with fields total_items and total_discount, then with
+        an unknown field.
+        Verification: The response should hold only those statistics, then be a 400 error.
+        """
+        response = self.client.get("/api/report?date=2019-08-02&fields=total_items,total_discount")
+        self.assertEqual(set(response.get_json()), {"date", "total_items", "total_discount"})
+        self.assertEqual(response.get_json()["total_items"], 3082)
+        response = self.client.get("/api/report?date=2019-08-02&fields=total_items,total_profit")
+        self.assertEqual(response.status_code, 400)
+
+    def test_concurrent_requests(self):
+        """
+        Test: /api/report is requested 50 times at once from separate threads, more than the pool size.
+        Verification: Every request should succeed with the same report.
+        """
+        def request(_):
+            response = app.test_client().get("/api/report?date=2019-08-02")
+            return response.status_code, response.get_json()
+
+        with ThreadPoolExecutor(max_workers=50) as executor:
+            responses = list(executor.map(request, range(50)))
+        self.assertTrue(all(status == 200 for status, body in responses))
+        self.assertTrue(all(body == responses[0][1] for status, body in responses))
+
+    def test_read_only(self):
+        """
+        Test: A delete is run on a connection from the read-only pool.
+        Verification: SQLite should refuse to write to the database.
+        """
+        with get_read_only_reports().engine.connect() as connection:
+            with self.assertRaises(OperationalError):
+                connection.exec_driver_sql("DELETE FROM orders")
+
+    def test_no_journal_mode_change(self):
+        """
+        Test: A report is calculated by ReadOnlyReports on a copy of the database in rollback journal mode.
+        Verification: The database should be left in that mode, as the read-only source never writes.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'eshop.db')
+            with db.engine.connect() as connection:
+                connection.exec_driver_sql(f"VACUUM INTO '{path}'")
+            with sqlite3.connect(path) as connection:
+                connection.execute('PRAGMA journal_mode=DELETE')
+            reports = ReadOnlyReports(path)
+            self.assertEqual(reports.get_report_statistics(self.test_date)["total_items"], 3082)
+            reports.engine.dispose()
+            with sqlite3.connect(path) as connection:
+                self.assertEqual(connection.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+test_backfill.py: unit testing for computing and writing the reports for every date with backfill.py
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+import backfill
+from eshopreport.models import ReportForDate
+
+
+class TestBackfill(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dates = backfill.get_report_dates()
+        cls.results = backfill.compute_reports(cls.dates + [datetime(2000, 1, 1).date()], processes=2)
+
+    def test_compute_reports(self):
+        """
+        Test: backfill.compute_reports is called with every date with orders, and 1-Jan-2000 which has none.
+        Verification: Should return a report for each date with orders, in order, matching ReportForDate.
+        """
+        self.assertEqual(len(self.dates), 60)
+        self.assertEqual([result["date"] for result in self.results], self.dates)
+        self.assertEqual(self.results[1], ReportForDate(self.dates[1]).get_all_results())
+
+    def test_write_results(self):
+        """
+        Test: backfill.write_results writes the reports to csv and json files.
+        Verification: Each file should contain a record for every report.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_path = os.path.join(temp_dir, 'reports.csv')
+            backfill.write_results(self.results, csv_path, 'csv')
+            with open(csv_path) as csv_file:
+                self.assertEqual(len(csv_file.readlines()), 61)
+
+            json_path = os.path.join(temp_dir, 'reports.json')
+            backfill.write_results(self.results, json_path, 'json')
+            with open(json_path) as json_file:
+                records = json.load(json_file)
+            self.assertEqual(len(records), 60)
+            self.assertEqual(records[1]["date"], "2019-08-02")
+            self.assertEqual(records[1]["total_items"], 3082)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+test_cache.py: unit testing for class ReportCache in module cache
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from eshopreport.cache import ReportCache
+from eshopreport.models import ReportForDate
+
+
+class CountingSource:
+    """Report source which returns the statistics for the test date and counts how many times it is called"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_report_statistics(self, date):
+        self.calls += 1
+        return ReportForDate.get_report_statistics(date)
+
+
+class TestReportCache(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        self.now = 0
+        self.source = CountingSource()
+        self.cache = ReportCache(max_size=2, ttl=60, source=self.source, clock=lambda: self.now)
+
+    def test_hit(self):
+        """
+        Test: ReportCache.get_all_results is called twice with test date 2-Aug-2019.
+        Verification: The report should be calculated once, counting one miss then one hit.
+        """
+        first = self.cache.get_all_results(self.test_date)
+        second = self.cache.get_all_results(self.test_date)
+        self.assertEqual(first, second)
+        self.assertEqual(first["total_items"], 3082)
+        self.assertEqual(self.source.calls, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_ttl(self):
+        """
+        Test: ReportCache.get_all_results is called for the test date again after its TTL of 60 seconds has passed.
+        Verification: The report should be recalculated.
+        """
+        self.cache.get_all_results(self.test_date)
+        self.now = 61
+        self.cache.get_all_results(self.test_date)
+        self.assertEqual(self.source.calls, 2)
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_lru_eviction(self):
+        """
+        Test: Three dates are cached in a cache of size 2, with the first date used again before the third is added.
+        Verification: The second date, as the least recently used, should be evicted.
+        """
+        dates = [self.test_date + timedelta(days=i) for i in range(3)]
+        self.cache.get_all_results(dates[0])
+        self.cache.get_all_results(dates[1])
+        self.cache.get_all_results(dates[0])
+        self.cache.get_all_results(dates[2])
+        self.assertEqual(len(self.cache), 2)
+        self.cache.get_all_results(dates[0])
+        self.assertEqual(self.source.calls, 3)
+        self.cache.get_all_results(dates[1])
+        self.assertEqual(self.source.calls, 4)
+
+    def test_invalidate(self):
+        """
+        Test: ReportCache.invalidate is called for the test date after it has been cached.
+        Verification: The next lookup should recalculate the report.
+        """
+        self.cache.get_all_results(self.test_date)
+        self.cache.invalidate([self.test_date])
+        self.cache.get_all_results(self.test_date)
+        self.assertEqual(self.source.calls, 2)
+
+    def test_invalidate_during_calculation(self):
+        """
+        Test: ReportCache.invalidate is called for the test date while its report is being calculated.
+        Verification: The report should be returned but not cached, so the next lookup recalculates it.
+        """
+        get_report_statistics = self.source.get_report_statistics
+
+        def invalidated_during(date):
+            results = get_report_statistics(date)
+            self.cache.invalidate([date])
+            return results
+
+        self.source.get_report_statistics = invalidated_during
+        self.assertEqual(self.cache.get_all_results(self.test_date)["total_items"], 3082)
+        self.assertEqual(len(self.cache), 0)
+        self.source.get_report_statistics = get_report_statistics
+        self.cache.get_all_results(self.test_date)
+        self.assertEqual(self.source.calls, 2)
+
+    def test_no_data(self):
+        """
+        Test: ReportCache.get_all_results is called with a date that has no orders (1-Jan-2000).
+        Verification: Should raise IndexError and not cache the date.
+        """
+        with self.assertRaises(IndexError):
+            self.cache.get_all_results(datetime(2000, 1, 1).date())
+        self.assertEqual(len(self.cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
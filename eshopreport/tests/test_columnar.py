@@ -0,0 +1,119 @@
+"""
+test_columnar.py: unit testing for class ColumnarStore in module columnar
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from eshopreport import db, generate_data
+from eshopreport.columnar import ColumnarStore
+from eshopreport.models import VendorCommissions, DailyReport, ReportForDate
+from temp_database import TemporaryDatabaseTestCase
+
+
+class CommissionRates:
+    """The commission rates of each date, given as a dict in place of a LookupIndex"""
+
+    def __init__(self, rates):
+        self.rates = rates
+
+    def get_commission_rates(self, date):
+        return self.rates.get(date, {})
+
+
+class TestColumnarStore(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    @classmethod
+    def setUpClass(cls):
+        cls.store = ColumnarStore.from_database()
+
+    def test_index(self):
+        """
+        Test: ColumnarStore.from_database loads the bundled database.
+        Verification: Should hold 60 dates, 438 orders and 5539 order lines, with a row offset for each date.
+        """
+        self.assertEqual(len(self.store.dates), 60)
+        self.assertEqual(len(self.store.order_ids), 438)
+        self.assertEqual(len(self.store.quantity), 5539)
+        self.assertEqual(self.store.date_offsets[-1], 438)
+        self.assertEqual(self.store.line_offsets[-1], 5539)
+
+    def test_get_report_statistics(self):
+        """
+        Test: ColumnarStore.get_report_statistics is called for every date in the store.
+        Verification: Each statistic should match ReportForDate.get_report_statistics for the same date.
+        """
+        for date in self.store.dates.tolist():
+            results = self.store.get_report_statistics(date)
+            expected = ReportForDate.get_report_statistics(date)
+            self.assertEqual(results["total_items"], expected["total_items"])
+            self.assertEqual(results["total_customers"], expected["total_customers"])
+            for statistic in ["total_discount", "avg_discount_rate", "avg_order_total", "total_commissions",
+                              "avg_commissions_per_order"]:
+                self.assertAlmostEqual(results[statistic] / expected[statistic], 1, 12)
+
+    def test_report_source(self):
+        """
+        Test: ReportForDate is created for test date 2-Aug-2019 with the store as its source.
+        Verification: Should report the value 3082 for total items.
+        """
+        self.assertEqual(ReportForDate(self.test_date, source=self.store).total_items, 3082)
+
+    def test_no_data(self):
+        """
+        Test: ColumnarStore.get_report_statistics is called with a date that has no orders (1-Jan-2000).
+        Verification: Should raise IndexError.
+        """
+        with self.assertRaises(IndexError):
+            self.store.get_report_statistics(datetime(2000, 1, 1).date())
+
+    def test_commission_rates(self):
+        """
+        Test: A store is built from four orders, one line each with a total of 10, from vendors 1, 1, 2 and 3 on test
+        date 2-Aug-2019, given commission rates of 0.5 for vendor 1 and 0.4 for vendor 2 on that date.
+        Verification: Each order should have its vendor's rate, or NaN for vendor 3 which has none, for total
+        commissions of 14 over three orders.
+        """
+        orders = pd.DataFrame({'id_': [1, 2, 3, 4], 'created_at': ['2019-08-02'] * 4, 'vendor_id': [1, 1, 2, 3],
+                               'customer_id': [1, 2, 3, 4]})
+        lines = pd.DataFrame({'order_id': [1, 2, 3, 4], 'quantity': [1] * 4, 'discount_rate': [0.0] * 4,
+                              'full_price_amount': [10.0] * 4, 'discounted_amount': [10.0] * 4,
+                              'total_amount': [10.0] * 4})
+        store = ColumnarStore.from_frames(orders, lines, CommissionRates({self.test_date: {1: 0.5, 2: 0.4}}))
+        self.assertEqual(store.commission_rates[:3].tolist(), [0.5, 0.5, 0.4])
+        self.assertTrue(np.isnan(store.commission_rates[3]))
+        results = store.get_report_statistics(self.test_date)
+        self.assertAlmostEqual(results["total_commissions"], 14.0)
+        self.assertAlmostEqual(results["avg_commissions_per_order"], 14.0 / 3)
+
+
+class TestColumnarDuplicateCommissions(TemporaryDatabaseTestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        super().setUp()
+        commission = VendorCommissions.query.filter(VendorCommissions.date == self.test_date).first()
+        db.session.add(VendorCommissions(commission.vendor_id, self.test_date, commission.rate + 0.1))
+        db.session.commit()
+        generate_data.refresh_daily_report({self.test_date})
+
+    def test_matches_sql(self):
+        """
+        Test: A vendor is given a second, higher commission rate on test date 2-Aug-2019, and a store is built from the
+        database.
+        Verification: The store should report the same statistics for the date as ReportForDate and DailyReport.
+        """
+        results = ColumnarStore.from_database().get_report_statistics(self.test_date)
+        for expected in [ReportForDate.get_report_statistics(self.test_date),
+                         DailyReport.get_report_statistics(self.test_date)]:
+            self.assertEqual(results["total_items"], expected["total_items"])
+            self.assertEqual(results["total_customers"], expected["total_customers"])
+            for statistic in ["total_discount", "avg_discount_rate", "avg_order_total", "total_commissions",
+                              "avg_commissions_per_order"]:
+                self.assertAlmostEqual(results[statistic] / expected[statistic], 1, 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
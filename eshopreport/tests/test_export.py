@@ -0,0 +1,72 @@
+"""
+test_export.py: unit testing for the streaming order-level export in module export and its /export/orders route
+"""
+
+import csv
+import io
+import json
+import unittest
+from datetime import datetime
+from eshopreport import app, export
+from eshopreport.models import Order, ReportForDate
+
+
+class TestExport(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_csv(self):
+        """
+        Test: The orders of test date 2-Aug-2019 are exported as CSV.
+        Verification: Should write a header and a row per order, whose items and commissions sum to the report's
+        total items (3082) and total commissions.
+        """
+        output = io.StringIO()
+        count = export.write_export(self.test_date, self.test_date, output, 'csv')
+        rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+        self.assertEqual(count, Order.query.filter(Order.created_at == self.test_date).count())
+        self.assertEqual(len(rows), count)
+        self.assertEqual(list(rows[0]), export.EXPORT_COLUMNS)
+        self.assertEqual(sum(int(row["total_items"]) for row in rows if row["total_items"]), 3082)
+        self.assertAlmostEqual(sum(float(row["commission"]) for row in rows if row["commission"]) /
+                               ReportForDate.get_total_commissions(self.test_date), 1, 12)
+
+    def test_batches(self):
+        """
+        Test: The orders of August 2019 are exported as NDJSON in batches of 10 rows.
+        Verification: Each yielded chunk but the last should hold 10 lines, and the lines should be in date order.
+        """
+        rows = export.query_order_rows(datetime(2019, 8, 1).date(), datetime(2019, 8, 31).date(), batch_size=10)
+        chunks = list(export.iter_ndjson(rows, batch_size=10))
+        self.assertTrue(all(chunk.count('\n') == 10 for chunk in chunks[:-1]))
+        dates = [json.loads(line)["date"] for chunk in chunks for line in chunk.splitlines()]
+        self.assertGreater(len(dates), 10)
+        self.assertEqual(dates, sorted(dates))
+
+    def test_route(self):
+        """
+        Test: /export/orders is requested for test date 2-Aug-2019 as NDJSON.
+        Verification: Should stream an attachment with one JSON object per order.
+        """
+        response = self.client.get("/export/orders?start=2019-08-02&format=ndjson")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertIn("orders_2019-08-02_2019-08-02.ndjson", response.headers["Content-Disposition"])
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(rows), Order.query.filter(Order.created_at == self.test_date).count())
+        self.assertTrue(all(row["date"] == "2019-08-02" for row in rows))
+
+    def test_invalid_request(self):
+        """
+        Test: /export/orders is requested with a malformed date, an end before the start and an unknown format.
+        Verification: Should return a 400 error for each.
+        """
+        for query in ["start=02-08-2019", "start=2019-08-02&end=2019-08-01", "start=2019-08-02&format=xml"]:
+            self.assertEqual(self.client.get(f"/export/orders?{query}").status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+"""
+test_generate_data.py: unit testing for importing the csv files in eshopreport/data with module generate_data
+"""
+
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+import pandas as pd
+from eshopreport import db, generate_data
+from eshopreport.cache import report_cache
+from eshopreport.models import Order, OrderLine, VendorCommissions, DailyReport, ReportForDate, ImportCheckpoint, \
+    OrderTotals
+from sqlalchemy import func
+from temp_database import TemporaryDatabaseTestCase
+
+
+class TestGenerateData(TemporaryDatabaseTestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def test_row_counts(self):
+        """
+        Test: generate_data.main is run against an empty database.
+        Verification: Each table should contain one row per line of its csv file.
+        """
+        self.assertEqual(Order.query.count(), 438)
+        self.assertEqual(OrderLine.query.count(), 5539)
+        self.assertEqual(VendorCommissions.query.count(), 540)
+        self.assertEqual(DailyReport.query.count(), 60)
+
+    def test_report_statistics(self):
+        """
+        Test: ReportForDate.get_report_statistics is called with test date 2-Aug-2019 on the imported data.
+        Verification: Should return the values calculated by hand for the bundled database.
+        """
+        results = ReportForDate.get_report_statistics(self.test_date)
+        self.assertEqual(results["total_items"], 3082)
+        self.assertEqual(results["total_customers"], 10)
+        self.assertEqual(round(results["total_discount"], 2), 20061245.64)
+        self.assertEqual(round(results["avg_order_total"], 2), 16499829.58)
+        self.assertEqual(round(results["total_commissions"], 2), 22358623.33)
+
+    def test_order_totals(self):
+        """
+        Test: The order_totals rows are compared with the order lines they are calculated from.
+        Verification: Each order with lines should have a row holding its number of lines, quantity and total.
+        """
+        expected = {row[0]: (row[1], row[2], round(row[3], 4)) for row in db.session.query(
+            OrderLine.order_id, func.count(OrderLine.id_), func.sum(OrderLine.quantity), func.sum(OrderLine.total_amount)
+            ).group_by(OrderLine.order_id)}
+        self.assertEqual({row.order_id: (row.line_count, row.quantity, round(row.total_amount, 4))
+                          for row in OrderTotals.query}, expected)
+
+    def test_duplicate_commissions(self):
+        """
+        Test: A second, lower commission rate is added for a vendor on test date 2-Aug-2019, and the date refreshed.
+        Verification: The order lines should not be counted once per rate, so every statistic should be unchanged as
+        the vendor's orders keep its highest rate.
+        """
+        commission = VendorCommissions.query.filter(VendorCommissions.date == self.test_date).first()
+        db.session.add(VendorCommissions(commission.vendor_id, self.test_date, commission.rate / 2))
+        db.session.commit()
+        expected = ReportForDate.get_report_statistics(self.test_date)
+        generate_data.refresh_daily_report({self.test_date})
+        results = ReportForDate.get_report_statistics(self.test_date)
+        self.assertEqual(results["total_items"], expected["total_items"])
+        for statistic in ["total_discount", "avg_order_total", "total_commissions", "avg_commissions_per_order"]:
+            self.assertAlmostEqual(results[statistic] / expected[statistic], 1, 12)
+        self.assertEqual(DailyReport.get_report_statistics(self.test_date), results)
+
+    def test_invalidates_cache(self):
+        """
+        Test: generate_data.refresh_daily_report is called for test date 2-Aug-2019 after it has been cached.
+        Verification: The test date should be removed from report_cache, so the next lookup is a miss.
+        """
+        report_cache.get_all_results(self.test_date)
+        misses = report_cache.misses
+        generate_data.refresh_daily_report([self.test_date])
+        report_cache.get_all_results(self.test_date)
+        self.assertEqual(report_cache.misses, misses + 1)
+
+
+class TestStreamingImport(TestGenerateData):
+    """Repeats the TestGenerateData tests for an import streamed in small chunks."""
+    memory_limit = 256 * 1024
+
+    def import_data(self):
+        generate_data.main(memory_limit=self.memory_limit)
+
+    def test_chunked(self):
+        """
+        Test: generate_data.get_chunk_size is called for data/order_lines.csv with the test memory limit.
+        Verification: Should split the file into more than one chunk.
+        """
+        chunk_size = generate_data.get_chunk_size(generate_data.ORDER_LINES_CSV, generate_data.ORDER_LINE_DTYPES,
+                                                  self.memory_limit)
+        self.assertLess(chunk_size, 5539)
+
+    def test_rates_reported_per_table(self):
+        """
+        Test: The data is imported again in small chunks, capturing what is printed.
+        Verification: The rows/sec should be reported once for each of the six tables, with its total rows.
+        """
+        output = StringIO()
+        with redirect_stdout(output):
+            self.import_data()
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[1].startswith("Imported 5,539 rows into order_line"))
+
+    def test_resume(self):
+        """
+        Test: An import is interrupted after the first 2000 order lines and then resumed from its checkpoint.
+        Verification: Every order line should be imported exactly once and the reports should be unchanged.
+        """
+        OrderLine.query.filter(OrderLine.id_ > 2000).delete()
+        db.session.merge(ImportCheckpoint(generate_data.ORDER_LINES_CSV, 2000))
+        db.session.commit()
+
+        with redirect_stdout(StringIO()):
+            generate_data.main(memory_limit=self.memory_limit, resume=True)
+        self.assertEqual(OrderLine.query.count(), 5539)
+        self.assertEqual(db.session.query(OrderLine.order_id, OrderLine.product_id).distinct().count(), 5539)
+        self.assertEqual(Order.query.count(), 438)
+        self.test_report_statistics()
+
+
+class TestParallelImport(TestGenerateData):
+    """Repeats the TestGenerateData tests for an import parsed in small chunks across two worker processes."""
+    memory_limit = 256 * 1024
+    processes = 2
+
+    def import_data(self):
+        generate_data.main(memory_limit=self.memory_limit, processes=self.processes)
+
+    def test_split_csv(self):
+        """
+        Test: generate_data.split_csv is called for data/order_lines.csv with 16KB chunks.
+        Verification: The ranges should be contiguous, cover the file after its header and each end at a line break.
+        """
+        ranges = generate_data.split_csv(generate_data.ORDER_LINES_CSV, 16 * 1024)
+        self.assertGreater(len(ranges), 1)
+        with open(generate_data.ORDER_LINES_CSV, 'rb') as csv_file:
+            data = csv_file.read()
+        self.assertEqual(ranges[0][0], data.index(b'\n') + 1)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (start, end), (next_start, next_end) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_resume(self):
+        """
+        Test: A parallel import is interrupted after the first 2000 order lines and then resumed from its checkpoint.
+        Verification: Every order line should be imported exactly once and the reports should be unchanged.
+        """
+        OrderLine.query.filter(OrderLine.id_ > 2000).delete()
+        db.session.merge(ImportCheckpoint(generate_data.ORDER_LINES_CSV, 2000))
+        db.session.commit()
+
+        with redirect_stdout(StringIO()):
+            generate_data.main(memory_limit=self.memory_limit, resume=True, processes=self.processes)
+        self.assertEqual(OrderLine.query.count(), 5539)
+        self.assertEqual(db.session.query(OrderLine.order_id, OrderLine.product_id).distinct().count(), 5539)
+        self.assertEqual(Order.query.count(), 438)
+        self.test_report_statistics()
+
+
+class TestAppend(TestGenerateData):
+    """Appends a delta of new and changed orders and order lines to the imported data."""
+
+    def write_csv(self, name, text):
+        path = os.path.join(self.delta_dir.name, name)
+        with open(path, 'w') as csv_file:
+            csv_file.write(text)
+        return path
+
+    def setUp(self):
+        super().setUp()
+        self.delta_dir = tempfile.TemporaryDirectory()
+        # Order 3 is unchanged, order 12 moves to a new customer and order 10000 is new. Order 2's first line is
+        # unchanged, its second line gains a unit and order 10000 has one line.
+        self.orders_path = self.write_csv('orders.csv', 'id,created_at,vendor_id,customer_id\n'
+                                                        '3,2019-08-01 11:51:07.349383,2,7449\n'
+                                                        '12,2019-08-02 09:00:00.000000,1,1\n'
+                                                        '10000,2019-08-02 10:00:00.000000,1,2\n')
+        self.order_lines_path = self.write_csv(
+            'order_lines.csv', 'order_id,product_id,product_description,product_price,product_vat_rate,'
+                               'discount_rate,quantity,full_price_amount,discounted_amount,vat_amount,total_amount\n'
+                               '2,794,IBM 032,21873,0.11,0,49,1071777,1071777,117895.47,1189672.47\n'
+                               '2,780,IBM 003,94046,0.2,0.761293446,30,2727334,651032.5004,130206.5001,781239.0005\n'
+                               '10000,794,IBM 032,100,0.2,0.5,7,700,350,70,420\n')
+        self.original = ReportForDate.get_report_statistics(self.test_date)
+        self.original_order_12 = Order.query.get(12)
+        with redirect_stdout(StringIO()):
+            self.touched_dates = generate_data.append(self.orders_path, self.order_lines_path)
+
+    def tearDown(self):
+        self.delta_dir.cleanup()
+        super().tearDown()
+
+    def test_row_counts(self):
+        """
+        Test: The delta is appended to the imported data.
+        Verification: Only the new order and order line should be added to the existing rows.
+        """
+        self.assertEqual(Order.query.count(), 439)
+        self.assertEqual(OrderLine.query.count(), 5540)
+        self.assertEqual(DailyReport.query.count(), 60)
+
+    def test_report_statistics(self):
+        """
+        Test: ReportForDate.get_report_statistics is called with test date 2-Aug-2019 after appending the delta.
+        Verification: The new order and its line should be included in the statistics and daily report.
+        """
+        results = ReportForDate.get_report_statistics(self.test_date)
+        self.assertEqual(results["total_items"], self.original["total_items"] + 7)
+        self.assertEqual(results["total_customers"], self.original["total_customers"] + 1)
+        self.assertAlmostEqual(results["total_discount"], self.original["total_discount"] + 350, 4)
+        self.assertAlmostEqual(DailyReport.get_report_statistics(self.test_date)["total_discount"],
+                               results["total_discount"], 4)
+
+    def test_upsert(self):
+        """
+        Test: The delta changes order 12 and the quantity of order 2's second line.
+        Verification: Both rows should be updated, and their dates included in the touched dates.
+        """
+        self.assertEqual(Order.query.get(12).customer_id, 1)
+        self.assertEqual(OrderLine.query.filter_by(order_id=2, product_id=780).one().quantity, 30)
+        self.assertTrue({datetime(2019, 8, 1).date(), self.original_order_12.created_at,
+                         self.test_date} <= self.touched_dates)
+
+
+class TestAppendReorderedColumns(TestAppend):
+    """Appends the same delta from csv files whose columns are in reverse order, which must be matched to the table
+    columns by name."""
+
+    def write_csv(self, name, text):
+        df = pd.read_csv(StringIO(text), dtype=str)
+        return super().write_csv(name, df[df.columns[::-1]].to_csv(index=False))
+
+    def test_columns(self):
+        """
+        Test: The new order 10000 is read back after appending the reordered delta.
+        Verification: Each value should be stored in the column of the same name.
+        """
+        order = Order.query.get(10000)
+        self.assertEqual((order.created_at, order.vendor_id, order.customer_id), (self.test_date, 1, 2))
+        self.assertEqual(OrderLine.query.filter_by(order_id=10000).one().product_description, 'IBM 032')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+test_instrumentation.py: unit testing for the traces and metrics in module instrumentation
+"""
+
+import unittest
+from datetime import datetime
+from eshopreport import app
+from eshopreport.instrumentation import Trace, format_labels, metrics
+from eshopreport.models import ReportForDate
+
+
+class TestInstrumentation(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        self.config = dict(app.config)
+        metrics.reset()
+
+    def tearDown(self):
+        app.config.update(self.config)
+        metrics.reset()
+
+    def get_totals(self, kind, **labels):
+        return metrics.totals[(kind, tuple(sorted(labels.items())))]
+
+    def test_statistic(self):
+        """
+        Test: ReportForDate.get_total_customers is called with test date 2-Aug-2019.
+        Verification: One call should be recorded, making one round trip which returns a row per customer.
+        """
+        ReportForDate.get_total_customers(self.test_date)
+        totals = self.get_totals("statistic", statistic="ReportForDate.get_total_customers")
+        self.assertEqual(totals["count"], 1)
+        self.assertEqual(totals["round_trips"], 1)
+        self.assertEqual(totals["rows"], 10)
+        self.assertGreater(totals["seconds"], 0)
+
+    def test_request(self):
+        """
+        Test: /report/range is requested for 1-Aug-2019 to 9-Aug-2019, then /metrics.
+        Verification: The range request should be served in Prometheus format, with one round trip returning 9 rows.
+        """
+        client = app.test_client()
+        client.get("/report/range?start=2019-08-01&end=2019-08-09")
+        response = client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        labels = '{method="GET",route="/report/range",status="200"}'
+        self.assertIn(f"eshopreport_request_seconds_count{labels} 1\n", response.get_data(as_text=True))
+        self.assertIn(f"eshopreport_request_round_trips_total{labels} 1\n", response.get_data(as_text=True))
+        self.assertIn(f"eshopreport_request_rows_total{labels} 9\n", response.get_data(as_text=True))
+
+    def test_disabled(self):
+        """
+        Test: ReportForDate.get_total_items is called with INSTRUMENTATION set to False.
+        Verification: Nothing should be recorded.
+        """
+        app.config['INSTRUMENTATION'] = False
+        ReportForDate.get_total_items(self.test_date)
+        self.assertEqual(len(metrics.totals), 0)
+
+    def test_explain_slow_queries(self):
+        """
+        Test: ReportForDate.get_report_statistics is traced with every query treated as slow and EXPLAIN capture on.
+        Verification: The query should be counted as slow and its plan should use the orders index.
+        """
+        app.config['INSTRUMENTATION_SLOW_QUERY_SECONDS'] = 0
+        app.config['INSTRUMENTATION_EXPLAIN_SLOW_QUERIES'] = True
+        with Trace("test") as trace:
+            ReportForDate.get_report_statistics(self.test_date)
+        self.assertEqual(metrics.slow_queries, 1)
+        self.assertTrue(any("ix_orders_created_at_id" in step for step in trace.queries[0]["plan"]))
+
+    def test_format_labels(self):
+        """
+        Test: format_labels is called with a value holding a quote, a backslash and a newline.
+        Verification: Each should be escaped.
+        """
+        self.assertEqual(format_labels([("route", 'a"b\\c\nd'), ("status", 200)]),
+                         '{route="a\\"b\\\\c\\nd",status="200"}')
+
+
+if __name__ == "__main__":
+    unittest.main()
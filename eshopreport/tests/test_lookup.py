@@ -0,0 +1,139 @@
+"""
+test_lookup.py: unit testing for class LookupIndex in module lookup
+"""
+
+import unittest
+from datetime import datetime
+from eshopreport import app, db, generate_data
+from eshopreport.lookup import LookupIndex, lookup_index
+from eshopreport.models import Order, OrderLine, OrderTotals, ProductPromotion, VendorCommissions
+from temp_database import TemporaryDatabaseTestCase
+
+
+class TestLookupIndex(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        self.index = LookupIndex()
+
+    def test_commission_rate(self):
+        """
+        Test: The commission rates of vendors 1 and 2 on test date 2-Aug-2019 are looked up.
+        Verification: Should give 0.27 and 0.19, and None for a vendor or date without a commission.
+        """
+        self.assertEqual(self.index.get_commission_rate(1, self.test_date), 0.27)
+        self.assertEqual(self.index.get_commission_rate(2, self.test_date), 0.19)
+        self.assertIsNone(self.index.get_commission_rate(-1, self.test_date))
+        self.assertIsNone(self.index.get_commission_rate(1, datetime(2000, 1, 1).date()))
+
+    def test_product_promotions(self):
+        """
+        Test: The product promotions on test date 2-Aug-2019 are looked up.
+        Verification: Should match the product_promotion rows for the date.
+        """
+        expected = dict(db.session.query(ProductPromotion.product_id, ProductPromotion.promotion_id
+                                         ).filter(ProductPromotion.date == self.test_date))
+        self.assertEqual(self.index.get_product_promotions(self.test_date), expected)
+        for product_id, promotion_id in expected.items():
+            self.assertEqual(self.index.get_promotion(product_id, self.test_date), promotion_id)
+
+    def test_promotion_breakdown(self):
+        """
+        Test: The promotion breakdown is calculated for test date 2-Aug-2019.
+        Verification: Promotions 1, 3 and 4 should each have one order line, of 50, 15 and 41 items, and the 120 lines
+        without a promotion should hold the remaining 2976 of the date's 3082 items.
+        """
+        breakdown = {row["promotion_id"]: row for row in self.index.get_promotion_breakdown(self.test_date)}
+        self.assertEqual({promotion_id: row["total_items"] for promotion_id, row in breakdown.items()
+                          if row["order_lines"]},
+                         {1: 50, 3: 15, 4: 41, None: 2976})
+        self.assertEqual(breakdown[None]["order_lines"], 120)
+        self.assertEqual(breakdown[1]["description"], "Google Ads")
+        self.assertEqual(sum(row["total_items"] for row in breakdown.values()), 3082)
+
+    def test_no_data(self):
+        """
+        Test: The promotion breakdown is calculated for a date that has no orders (1-Jan-2000).
+        Verification: Should raise IndexError.
+        """
+        with self.assertRaises(IndexError):
+            self.index.get_promotion_breakdown(datetime(2000, 1, 1).date())
+
+    def test_route(self):
+        """
+        Test: /report/promotions is requested for test date 2-Aug-2019, a malformed date and a date with no data.
+        Verification: Should return the breakdown, a 400 error and a 404 error respectively.
+        """
+        client = app.test_client()
+        response = client.get("/report/promotions?date=2019-08-02")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(row["total_items"] for row in response.get_json()["promotions"]), 3082)
+        self.assertEqual(client.get("/report/promotions?date=02-08-2019").status_code, 400)
+        self.assertEqual(client.get("/report/promotions?date=2000-01-01").status_code, 404)
+
+
+class TestLookupIndexRefresh(TemporaryDatabaseTestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def add_promotion(self, date):
+        """int: Promotes, with promotion 1 on the input date, a product sold on test date 2-Aug-2019 which was not
+        promoted, as an import would, and returns the product's id"""
+        promoted = {product_id for product_id, in db.session.query(ProductPromotion.product_id
+                                                                   ).filter(ProductPromotion.date == date)}
+        product_id = next(product_id for product_id, in db.session.query(OrderLine.product_id
+                                                                         ).join(Order, OrderLine.order_id == Order.id_
+                                                                         ).filter(Order.created_at == self.test_date)
+                          if product_id not in promoted)
+        db.session.add(ProductPromotion(product_id, date, 1))
+        db.session.commit()
+        return product_id
+
+    def test_refresh(self):
+        """
+        Test: A product is promoted on test date 2-Aug-2019 and the daily report refreshed for that date.
+        Verification: The index should give the new promotion, and keep the partitions of the other dates.
+        """
+        other_date = datetime(2019, 8, 1).date()
+        other_promotions = dict(lookup_index.get_product_promotions(other_date))
+        product_id = self.add_promotion(self.test_date)
+        self.assertIsNone(lookup_index.get_promotion(product_id, self.test_date))
+
+        generate_data.refresh_daily_report({self.test_date})
+        self.assertEqual(lookup_index.get_promotion(product_id, self.test_date), 1)
+        self.assertEqual(lookup_index.get_product_promotions(other_date), other_promotions)
+
+    def test_commission_refresh(self):
+        """
+        Test: Vendor 1 is given two more commission rates, 0.1 and 0.9, on test date 2-Aug-2019 and the daily report
+        refreshed for that date.
+        Verification: The index should give the vendor's highest rate, 0.9, and so should the vendor's order_totals
+        rows for the date.
+        """
+        self.assertEqual(lookup_index.get_commission_rate(1, self.test_date), 0.27)
+        db.session.add_all([VendorCommissions(1, self.test_date, 0.1), VendorCommissions(1, self.test_date, 0.9)])
+        db.session.commit()
+        generate_data.refresh_daily_report({self.test_date})
+        self.assertEqual(lookup_index.get_commission_rate(1, self.test_date), 0.9)
+        rates = {rate for rate, in db.session.query(OrderTotals.commission_rate
+                                                    ).join(Order, OrderTotals.order_id == Order.id_
+                                                    ).filter(Order.created_at == self.test_date, Order.vendor_id == 1)}
+        self.assertEqual(rates, {0.9})
+
+    def test_ttl(self):
+        """
+        Test: A product is promoted on test date 2-Aug-2019 without refreshing the index, as by an import run in
+        another process, and the index is used before and after its time to live of 60 seconds.
+        Verification: The promotion should only be found once the time to live has passed.
+        """
+        now = 0
+        index = LookupIndex(ttl=60, clock=lambda: now)
+        index.get_product_promotions(self.test_date)
+        product_id = self.add_promotion(self.test_date)
+        now = 59
+        self.assertIsNone(index.get_promotion(product_id, self.test_date))
+        now = 60
+        self.assertEqual(index.get_promotion(product_id, self.test_date), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
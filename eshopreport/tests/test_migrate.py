@@ -0,0 +1,106 @@
+"""
+test_migrate.py: unit testing for upgrading a database to the schema in models.py with module migrate
+"""
+
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from eshopreport import db, migrate
+from eshopreport.models import OrderLine, OrderTotals, ReportForDate
+from sqlalchemy import inspect
+from temp_database import TemporaryDatabaseTestCase
+
+ORIGINAL_ORDER_LINE_TABLE = """
+CREATE TABLE order_line_original (
+    id_ INTEGER NOT NULL,
+    order_id INTEGER,
+    product_id INTEGER NOT NULL,
+    product_description VARCHAR(200) NOT NULL,
+    product_price FLOAT NOT NULL,
+    product_vat_rate FLOAT NOT NULL,
+    discount_rate FLOAT NOT NULL,
+    quantity INTEGER NOT NULL,
+    full_price_amount FLOAT NOT NULL,
+    discounted_amount FLOAT NOT NULL,
+    vat_amount FLOAT NOT NULL,
+    total_amount FLOAT NOT NULL,
+    PRIMARY KEY (id_),
+    FOREIGN KEY(order_id) REFERENCES orders (id_),
+    FOREIGN KEY(order_id) REFERENCES product_promotion (product_id),
+    FOREIGN KEY(product_id) REFERENCES products (id_)
+)"""
+
+
+class TestUpgrade(TemporaryDatabaseTestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        # Give the imported data the original schema, which has no indexes, no order_totals table and a foreign key
+        # from order_line.order_id to product_promotion
+        super().setUp()
+        self.expected = ReportForDate.get_report_statistics(self.test_date)
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP TABLE order_totals')
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.drop(connection)
+            connection.exec_driver_sql(ORIGINAL_ORDER_LINE_TABLE)
+            connection.exec_driver_sql('INSERT INTO order_line_original SELECT * FROM order_line')
+            connection.exec_driver_sql('DROP TABLE order_line')
+            connection.exec_driver_sql('ALTER TABLE order_line_original RENAME TO order_line')
+        # Leaving WAL mode needs the only connection to the database
+        db.session.remove()
+        db.engine.dispose()
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA journal_mode=DELETE')
+        with redirect_stdout(StringIO()):
+            migrate.upgrade()
+
+    def test_indexes(self):
+        """
+        Test: migrate.upgrade is run on a database without indexes.
+        Verification: Every index declared in models.py should be created.
+        """
+        inspector = inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            self.assertEqual({index.name for index in table.indexes},
+                             {index['name'] for index in inspector.get_indexes(table.name)})
+
+    def test_foreign_keys(self):
+        """
+        Test: migrate.upgrade is run on a database with the original order_line foreign keys.
+        Verification: The table should be rebuilt so that order_line.order_id only references orders.id_.
+        """
+        self.assertEqual(migrate.get_foreign_keys(inspect(db.engine), 'order_line'),
+                         {(('order_id',), 'orders', ('id_',)), (('product_id',), 'products', ('id_',))})
+        self.assertEqual(OrderLine.query.count(), 5539)
+
+    def test_wal_mode(self):
+        """
+        Test: migrate.upgrade is run on a database in the default rollback journal mode.
+        Verification: The database should be switched to write-ahead logging.
+        """
+        with db.engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+
+    def test_order_totals(self):
+        """
+        Test: migrate.upgrade is run on a database without the order_totals table.
+        Verification: The table should be created with a row for each order with order lines.
+        """
+        self.assertEqual(OrderTotals.query.count(), db.session.query(OrderLine.order_id).distinct().count())
+
+    def test_report_statistics(self):
+        """
+        Test: ReportForDate.get_report_statistics is called with test date 2-Aug-2019 after migrate.upgrade.
+        Verification: Should return the same statistics as before the upgrade. The order lines may be summed in a
+        different order using the new indexes, so they are compared to 6DP.
+        """
+        results = ReportForDate.get_report_statistics(self.test_date)
+        for statistic, value in self.expected.items():
+            self.assertAlmostEqual(results[statistic], value, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,9 @@ test_report.py: unit testing for static methods in class ReportForDate in module
 
 import unittest
 from datetime import datetime
-from eshopreport.models import ReportForDate
+from eshopreport import app, db, models
+from eshopreport.instrumentation import Trace
+from eshopreport.models import ReportForDate, ReportForRange, DailyReport
 
 
 class TestReportForDate(unittest.TestCase):
@@ -68,6 +70,208 @@ class TestReportForDate(unittest.TestCase):
         avg_commissions_per_order = ReportForDate.get_avg_commissions_per_order(self.test_date)
         self.assertEqual(round(avg_commissions_per_order, 2), 2235862.33)
 
+    def test_get_report_statistics(self):
+        """
+        Test: ReportForDate.get_report_statistics is called with test date 2-Aug-2019.
+        Verification: Each statistic should match the value returned by the corresponding get_statistic method.
+        """
+        results = ReportForDate.get_report_statistics(self.test_date)
+        self.assertEqual(results["total_items"], ReportForDate.get_total_items(self.test_date))
+        self.assertEqual(results["total_customers"], ReportForDate.get_total_customers(self.test_date))
+        self.assertAlmostEqual(results["total_discount"], ReportForDate.get_total_discount(self.test_date), 6)
+        self.assertAlmostEqual(results["avg_discount_rate"], ReportForDate.get_avg_discount_rate(self.test_date), 12)
+        self.assertAlmostEqual(results["avg_order_total"], ReportForDate.get_avg_order_total(self.test_date), 6)
+        self.assertAlmostEqual(results["total_commissions"], ReportForDate.get_total_commissions(self.test_date), 6)
+        self.assertAlmostEqual(results["avg_commissions_per_order"],
+                               ReportForDate.get_avg_commissions_per_order(self.test_date), 6)
+
+    def test_get_report_statistics_no_data(self):
+        """
+        Test: ReportForDate.get_report_statistics is called with a date that has no orders (1-Jan-2000).
+        Verification: Should raise IndexError, as the get_statistic methods do.
+        """
+        with self.assertRaises(IndexError):
+            ReportForDate.get_report_statistics(datetime(2000, 1, 1).date())
+
+
+class TestDailyReport(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def tearDown(self):
+        # Discard any uncommitted refresh so the bundled database is left untouched
+        db.session.rollback()
+
+    def test_refresh(self):
+        """
+        Test: DailyReport.refresh is called for test date 2-Aug-2019 and the row is read back.
+        Verification: Each statistic should match ReportForDate.get_report_statistics for the same date.
+        """
+        DailyReport.refresh([self.test_date])
+        results = DailyReport.get_report_statistics(self.test_date)
+        expected = ReportForDate.get_report_statistics(self.test_date)
+        self.assertEqual(results.keys(), expected.keys())
+        for statistic, value in expected.items():
+            self.assertAlmostEqual(results[statistic], value, 6)
+
+    def test_refresh_no_data(self):
+        """
+        Test: DailyReport.refresh is called for a date that has no orders (1-Jan-2000).
+        Verification: No row should be stored and get_report_statistics should raise IndexError.
+        """
+        date = datetime(2000, 1, 1).date()
+        DailyReport.refresh([date])
+        self.assertIsNone(DailyReport.query.get(date))
+        with self.assertRaises(IndexError):
+            DailyReport.get_report_statistics(date)
+
+
+class TestLazyReport(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def count_queries(self, function):
+        with Trace("test") as trace:
+            function()
+        return len(trace.queries)
+
+    def test_no_queries_until_used(self):
+        """
+        Test: ReportForDate is created with test date 2-Aug-2019, then total_commissions and avg_commissions_per_order
+        are read twice.
+        Verification: Creating the report should run no queries, and the two statistics, which share a query, one.
+        """
+        self.assertEqual(self.count_queries(lambda: ReportForDate(self.test_date)), 0)
+        report = ReportForDate(self.test_date)
+        self.assertEqual(self.count_queries(lambda: (report.total_commissions, report.avg_commissions_per_order,
+                                                     report.total_commissions)), 1)
+        self.assertAlmostEqual(report.total_commissions, 22358623.3281771, 6)
+
+    def test_query_groups(self):
+        """
+        Test: Each query group's statistics are calculated alone for test date 2-Aug-2019.
+        Verification: Each group should take one query and match ReportForDate.get_report_statistics.
+        """
+        expected = ReportForDate.get_report_statistics(self.test_date)
+        for group, fields in ReportForDate.query_groups.items():
+            report = ReportForDate(self.test_date)
+            self.assertEqual(self.count_queries(lambda: report.get_results(fields)), 1)
+            for field in fields:
+                self.assertAlmostEqual(report.get_results([field])[field], expected[field], 6)
+
+    def test_all_results(self):
+        """
+        Test: ReportForDate.get_all_results is called after total_items has been read.
+        Verification: The remaining statistics should be fetched together in one query.
+        """
+        report = ReportForDate(self.test_date)
+        report.total_items
+        self.assertEqual(self.count_queries(report.get_all_results), 1)
+        self.assertEqual(report.get_all_results()["total_customers"], 10)
+
+    def test_no_data(self):
+        """
+        Test: total_items is read from a report for a date that has no orders (1-Jan-2000).
+        Verification: Should raise IndexError.
+        """
+        with self.assertRaises(IndexError):
+            ReportForDate(datetime(2000, 1, 1).date()).total_items
+
+    def test_unknown_field(self):
+        """
+        Test: ReportForDate.get_results is called with an unknown statistic.
+        Verification: Should raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            ReportForDate(self.test_date).get_results(["total_items", "total_profit"])
+
+
+class TestReportForDates(unittest.TestCase):
+    test_dates = [datetime(2019, 8, 9).date(), datetime(2019, 8, 2).date(), datetime(2000, 1, 1).date()]
+
+    def test_for_dates(self):
+        """
+        Test: ReportForDate.for_dates is called with 9-Aug-2019, 2-Aug-2019 and 1-Jan-2000, which has no orders.
+        Verification: Should return a result for each date in order, matching ReportForDate.get_report_statistics,
+        with every statistic None for 1-Jan-2000.
+        """
+        results = ReportForDate.for_dates(self.test_dates)
+        self.assertEqual([result["date"] for result in results], sorted(self.test_dates))
+        self.assertTrue(all(results[0][statistic] is None for statistic in ReportForDate.fields))
+        for result in results[1:]:
+            expected = ReportForDate.get_report_statistics(result["date"])
+            for statistic, value in expected.items():
+                self.assertAlmostEqual(result[statistic], value, 6)
+
+    def test_batches(self):
+        """
+        Test: ReportForDate.for_dates is called with the batch size set to 1, so each date is queried separately.
+        Verification: Should return the same results as a single batch.
+        """
+        expected = ReportForDate.for_dates(self.test_dates)
+        batch_size = models.IN_CLAUSE_BATCH_SIZE
+        models.IN_CLAUSE_BATCH_SIZE = 1
+        try:
+            self.assertEqual(ReportForDate.for_dates(self.test_dates), expected)
+        finally:
+            models.IN_CLAUSE_BATCH_SIZE = batch_size
+
+    def test_route(self):
+        """
+        Test: /report/dates is requested for 2-Aug-2019 and 1-Jan-2000, then with an invalid date.
+        Verification: Should return both dates, 1-Jan-2000 with null statistics, then a 400 error.
+        """
+        client = app.test_client()
+        results = client.get("/report/dates?dates=2019-08-02,2000-01-01").get_json()["results"]
+        self.assertEqual([result["date"] for result in results], ["2000-01-01", "2019-08-02"])
+        self.assertIsNone(results[0]["total_items"])
+        self.assertEqual(results[1]["total_items"], 3082)
+        self.assertEqual(client.get("/report/dates?dates=2019-08-02,tomorrow").status_code, 400)
+
+
+class TestReportForRange(unittest.TestCase):
+    start_date = datetime(2019, 8, 1).date()
+    end_date = datetime(2019, 8, 31).date()
+
+    def test_daily_results(self):
+        """
+        Test: ReportForRange is created by day for 1-Aug-2019 to 31-Aug-2019.
+        Verification: Should return 31 buckets, the one for 2-Aug-2019 matching ReportForDate.get_report_statistics.
+        """
+        results = ReportForRange(self.start_date, self.end_date, "day").results
+        self.assertEqual(len(results), 31)
+        result = next(result for result in results if result["date"] == datetime(2019, 8, 2).date())
+        expected = ReportForDate.get_report_statistics(datetime(2019, 8, 2).date())
+        for statistic, value in expected.items():
+            self.assertAlmostEqual(result[statistic], value, 6)
+
+    def test_monthly_results(self):
+        """
+        Test: ReportForRange is created by month for 1-Aug-2019 to 31-Aug-2019.
+        Verification: Should return one bucket whose total items and discount are the sums of the daily buckets.
+        """
+        daily = ReportForRange(self.start_date, self.end_date, "day").results
+        monthly = ReportForRange(self.start_date, self.end_date, "month").results
+        self.assertEqual(len(monthly), 1)
+        self.assertEqual(monthly[0]["date"], self.start_date)
+        self.assertEqual(monthly[0]["total_items"], sum(result["total_items"] for result in daily))
+        self.assertAlmostEqual(monthly[0]["total_discount"], sum(result["total_discount"] for result in daily), 4)
+
+    def test_invalid_granularity(self):
+        """
+        Test: ReportForRange is created with the granularity "year".
+        Verification: Should raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            ReportForRange(self.start_date, self.end_date, "year")
+
+    def test_inverted_range_route(self):
+        """
+        Test: /report/range is requested with an end date (1-Aug-2019) before its start date (31-Aug-2019).
+        Verification: Should return a 400 error.
+        """
+        response = app.test_client().get("/report/range?start=2019-08-31&end=2019-08-01")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["error"], "The end date must not be before the start date")
+
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""
+test_snapshot.py: unit testing for exporting and importing columnar snapshots with module snapshot
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+import numpy as np
+from eshopreport import db, snapshot
+from eshopreport.models import Order, OrderLine, Product, VendorCommissions, ReportForDate
+from temp_database import TemporaryDatabaseTestCase
+
+
+class TestSnapshot(unittest.TestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.snapshot = snapshot.export_snapshot(os.path.join(cls.directory, 'snapshot'))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def test_manifest(self):
+        """
+        Test: The bundled database is exported to a snapshot.
+        Verification: The manifest should hold the row count of each table, and the text columns should be
+        dictionary-encoded.
+        """
+        tables = self.snapshot.manifest["tables"]
+        self.assertEqual(tables["orders"]["rows"], 438)
+        self.assertEqual(tables["order_line"]["rows"], 5539)
+        self.assertEqual(tables["products"]["rows"], db.session.query(Product).count())
+        self.assertEqual(tables["order_line"]["columns"]["product_description"], "dictionary")
+        self.assertEqual(tables["orders"]["columns"]["created_at"], "values")
+
+    def test_dictionary_encoding(self):
+        """
+        Test: The product descriptions of the order lines are read back from the snapshot.
+        Verification: The dictionary should hold each distinct description once, and decoding should give the
+        descriptions in the database.
+        """
+        codes, dictionary = self.snapshot.get_column("order_line", "product_description")
+        self.assertEqual(len(dictionary), len(set(dictionary.tolist())))
+        self.assertLess(len(dictionary), len(codes))
+        frame = self.snapshot.get_frame("order_line")
+        expected = dict(db.session.query(OrderLine.id_, OrderLine.product_description))
+        self.assertEqual(dict(zip(frame["id_"], frame["product_description"])), expected)
+
+    def test_date_column(self):
+        """
+        Test: The orders table is read back from the snapshot.
+        Verification: The order dates should be datetime64[D] and match the database.
+        """
+        created_at = self.snapshot.get_column("orders", "created_at")
+        self.assertEqual(created_at.dtype, np.dtype('datetime64[D]'))
+        self.assertEqual(sorted(created_at.tolist()),
+                         sorted(created_at for created_at, in db.session.query(Order.created_at)))
+
+    def test_store(self):
+        """
+        Test: The snapshot's report store is loaded and used as the source of ReportForDate for test date 2-Aug-2019.
+        Verification: Its arrays should be memory-mapped, and it should report the value 3082 for total items.
+        """
+        store = self.snapshot.get_store()
+        self.assertIsInstance(store.quantity, np.memmap)
+        self.assertEqual(ReportForDate(self.test_date, source=store).total_items, 3082)
+
+    def test_unsupported_version(self):
+        """
+        Test: A snapshot whose manifest has a different version is loaded.
+        Verification: Should raise ValueError.
+        """
+        directory = os.path.join(self.directory, 'old')
+        shutil.copytree(self.snapshot.directory, directory)
+        with open(os.path.join(directory, 'manifest.json'), 'w') as manifest_file:
+            manifest_file.write('{"version": 0, "tables": {}}')
+        with self.assertRaises(ValueError):
+            snapshot.Snapshot(directory)
+
+
+class TestImportSnapshot(TemporaryDatabaseTestCase):
+    test_date = datetime(2019, 8, 2).date()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        snapshot.export_snapshot(os.path.join(self.directory, 'snapshot'))
+        self.expected = {model: db.session.query(model).count() for model in [Order, OrderLine, VendorCommissions]}
+        self.expected_report = ReportForDate(self.test_date).get_all_results()
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.directory)
+
+    def import_data(self):
+        snapshot.import_snapshot(os.path.join(self.directory, 'snapshot'))
+
+    def test_import_snapshot(self):
+        """
+        Test: The snapshot of the bundled database is imported into an empty database.
+        Verification: Should give the same row counts, and the same report for test date 2-Aug-2019.
+        """
+        for model, count in self.expected.items():
+            self.assertEqual(db.session.query(model).count(), count)
+        results = ReportForDate(self.test_date).get_all_results()
+        for statistic, value in self.expected_report.items():
+            if isinstance(value, float):
+                self.assertAlmostEqual(results[statistic] / value, 1, 12)
+            else:
+                self.assertEqual(results[statistic], value)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+test_synthetic_data.py: unit testing for generating the benchmark csv files with module synthetic_data in benchmarks
+"""
+
+import os
+import tempfile
+import unittest
+import pandas as pd
+from benchmarks import synthetic_data
+from eshopreport.generate_data import DATA_DIR
+
+
+class TestSyntheticData(unittest.TestCase):
+
+    def setUp(self):
+        self.out_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.out_dir.cleanup()
+
+    def read_csv(self, name):
+        return pd.read_csv(os.path.join(self.out_dir.name, name))
+
+    def test_line_count(self):
+        """
+        Test: synthetic_data.main is called for 1003 order lines, 12 per order, written 7 orders at a time.
+        Verification: order_lines.csv should hold exactly 1003 lines, each for an order in orders.csv, with a single
+        header.
+        """
+        chunk_orders = synthetic_data.CHUNK_ORDERS
+        synthetic_data.CHUNK_ORDERS = 7
+        try:
+            synthetic_data.main(self.out_dir.name, 1003)
+        finally:
+            synthetic_data.CHUNK_ORDERS = chunk_orders
+        order_lines = self.read_csv('order_lines.csv')
+        orders = self.read_csv('orders.csv')
+        self.assertEqual(len(order_lines), 1003)
+        self.assertTrue(order_lines['order_id'].isin(orders['id']).all())
+        self.assertTrue(orders['id'].is_unique)
+
+    def test_headers(self):
+        """
+        Test: synthetic_data.main is called for 100 order lines.
+        Verification: Each csv file should have the same columns, in the same order, as its file in eshopreport/data.
+        """
+        synthetic_data.main(self.out_dir.name, 100)
+        for name in sorted(os.listdir(DATA_DIR)):
+            with open(os.path.join(DATA_DIR, name)) as expected, open(os.path.join(self.out_dir.name, name)) as result:
+                self.assertEqual(result.readline(), expected.readline(), name)
+
+    def test_unique_order_products(self):
+        """
+        Test: synthetic_data.main is called with line counts which are and are not a multiple of the lines per order,
+        including one where an order would need more lines than there are products.
+        Verification: No order should have two lines for the same product, and each count should be exact.
+        """
+        for lines, lines_per_order, products in [(1200, 12, 1000), (1003, 12, 1000), (23, 12, 20), (5, 12, 3)]:
+            with self.subTest(lines=lines, lines_per_order=lines_per_order, products=products):
+                synthetic_data.main(self.out_dir.name, lines, lines_per_order=lines_per_order, products=products)
+                order_lines = self.read_csv('order_lines.csv')
+                self.assertEqual(len(order_lines), lines)
+                self.assertFalse(order_lines.duplicated(['order_id', 'product_id']).any())
+
+
+if __name__ == '__main__':
+    unittest.main()